@@ -1,9 +1,12 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import os
+from contextlib import asynccontextmanager
+import httpx
 from dotenv import load_dotenv
 
 from app.routers import upload, query, ml_proxy
+from app.utils.json_response import OrjsonResponse
 
 # Load environment variables
 load_dotenv()
@@ -11,10 +14,20 @@ load_dotenv()
 # Get ML API URL from environment variables
 ML_API_URL = os.getenv("ML_API_URL", "http://localhost:8080")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared client: ML proxy calls reuse pooled keep-alive connections to the
+    # ML service instead of opening a new connection per request
+    async with httpx.AsyncClient() as ml_client:
+        app.state.ml_client = ml_client
+        yield
+
 app = FastAPI(
     title="Time Series Analysis API",
     description="API for time series data analysis with CSV to Parquet conversion and DuckDB querying",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=OrjsonResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Query, BackgroundTasks, Request, Response
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import httpx
@@ -6,7 +6,7 @@ import os
 import json
 import logging
 import traceback
-from ..utils.redis_client import retrieve_data
+from ..utils.redis_client import retrieve_metadata
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -41,7 +41,7 @@ class MemoryEfficientMLRequest(BaseModel):
     processor_type: Optional[str] = "chunked"  # "chunked", "dask", or "auto"
 
 @router.post("/analyze")
-async def analyze_dataset(request: MLAnalysisRequest):
+async def analyze_dataset(request: MLAnalysisRequest, http_request: Request):
     """
     Proxy endpoint to analyze a dataset using the ML service.
     
@@ -55,6 +55,7 @@ async def analyze_dataset(request: MLAnalysisRequest):
     
     Args:
         request: MLAnalysisRequest with dataset_id, date_column, and target_column
+        http_request: Incoming request, used to reach the shared ML service client
         
     Returns:
         ML analysis results
@@ -65,8 +66,7 @@ async def analyze_dataset(request: MLAnalysisRequest):
         
         # Step 1: Verify the dataset exists in Redis
         # Just check if metadata exists, don't retrieve the actual data
-        meta_key = f"{request.dataset_id}:meta"
-        metadata = await retrieve_data(meta_key)
+        metadata = await retrieve_metadata(request.dataset_id)
         
         if not metadata:
             raise HTTPException(
@@ -78,51 +78,50 @@ async def analyze_dataset(request: MLAnalysisRequest):
         
         # Step 2: Call the ML service
         try:
-            async with httpx.AsyncClient() as client:
-                # Map the request to ML service format
-                ml_request = {
-                    "dataset_id": request.dataset_id,
-                    "dateColumn": request.date_column,
-                    "targetColumn": request.target_column,
-                    "multipleWaterfallPlots": request.multiple_waterfall_plots,
-                    "delete_after_analysis": True,  # Always clean up after analysis
-                    "exclude_columns": request.exclude_columns or []
-                }
-                
-                logger.info(f"Calling ML service at {ML_API_URL}/analyze_from_redis")
+            # Map the request to ML service format
+            ml_request = {
+                "dataset_id": request.dataset_id,
+                "dateColumn": request.date_column,
+                "targetColumn": request.target_column,
+                "multipleWaterfallPlots": request.multiple_waterfall_plots,
+                "delete_after_analysis": True,  # Always clean up after analysis
+                "exclude_columns": request.exclude_columns or []
+            }
+            
+            logger.info(f"Calling ML service at {ML_API_URL}/analyze_from_redis")
+            
+            # Use a longer timeout for ML analysis (5 minutes)
+            response = await http_request.app.state.ml_client.post(
+                f"{ML_API_URL}/analyze_from_redis",
+                json=ml_request,
+                timeout=300.0
+            )
+            
+            # Check for errors
+            if response.status_code != 200:
+                error_detail = "Unknown error"
+                try:
+                    error_data = response.json()
+                    error_detail = error_data.get("detail", error_detail)
+                except:
+                    error_detail = response.text
                 
-                # Use a longer timeout for ML analysis (5 minutes)
-                response = await client.post(
-                    f"{ML_API_URL}/analyze_from_redis",
-                    json=ml_request,
-                    timeout=300.0
+                logger.error(f"ML service error: {error_detail}")
+                raise HTTPException(
+                    status_code=response.status_code,
+                    detail=f"ML service error: {error_detail}"
                 )
-                
-                # Check for errors
-                if response.status_code != 200:
-                    error_detail = "Unknown error"
-                    try:
-                        error_data = response.json()
-                        error_detail = error_data.get("detail", error_detail)
-                    except:
-                        error_detail = response.text
-                    
-                    logger.error(f"ML service error: {error_detail}")
-                    raise HTTPException(
-                        status_code=response.status_code,
-                        detail=f"ML service error: {error_detail}"
-                    )
-                
-                # Parse and return the results
-                results = response.json()
-                logger.info("ML analysis completed successfully")
-                
-                return {
-                    "success": True,
-                    "dataset_id": request.dataset_id,
-                    "results": results
-                }
-                
+            
+            # The ML service body is already JSON: splice it into the wrapper
+            # as-is rather than parsing and re-serializing the SHAP plots
+            logger.info("ML analysis completed successfully")
+            
+            body = (
+                b'{"success":true,"dataset_id":' + json.dumps(request.dataset_id).encode()
+                + b',"results":' + response.content + b'}'
+            )
+            return Response(content=body, media_type="application/json")
+            
         except httpx.RequestError as e:
             logger.error(f"Error connecting to ML service: {str(e)}")
             raise HTTPException(
@@ -142,7 +141,7 @@ async def analyze_dataset(request: MLAnalysisRequest):
         )
 
 @router.post("/analyze_efficient")
-async def analyze_dataset_efficiently(request: MemoryEfficientMLRequest):
+async def analyze_dataset_efficiently(request: MemoryEfficientMLRequest, http_request: Request):
     """
     Proxy endpoint to analyze a dataset using the memory-efficient ML service.
     
@@ -157,6 +156,7 @@ async def analyze_dataset_efficiently(request: MemoryEfficientMLRequest):
     
     Args:
         request: MemoryEfficientMLRequest with dataset_id, date_column, and target_column
+        http_request: Incoming request, used to reach the shared ML service client
         
     Returns:
         ML analysis results with resource usage metrics
@@ -168,8 +168,7 @@ async def analyze_dataset_efficiently(request: MemoryEfficientMLRequest):
         
         # Step 1: Verify the dataset exists in Redis
         # Just check if metadata exists, don't retrieve the actual data
-        meta_key = f"{request.dataset_id}:meta"
-        metadata = await retrieve_data(meta_key)
+        metadata = await retrieve_metadata(request.dataset_id)
         
         if not metadata:
             raise HTTPException(
@@ -181,67 +180,66 @@ async def analyze_dataset_efficiently(request: MemoryEfficientMLRequest):
         
         # Step 2: Call the ML service's memory-efficient endpoint
         try:
-            async with httpx.AsyncClient() as client:
-                # Map the request to ML service format
-                ml_request = {
-                    "dataset_id": request.dataset_id,
-                    "dateColumn": request.date_column,
-                    "targetColumn": request.target_column,
-                    "exclude_columns": request.exclude_columns or [],
-                    "test_size": request.test_size,
-                    "max_memory_mb": request.max_memory_mb,
-                    "processor_type": request.processor_type,
-                    "delete_after_analysis": True  # Always clean up after analysis
-                }
-                
-                logger.info(f"Calling ML service at {ML_API_URL}/memory_efficient_analyze")
+            # Map the request to ML service format
+            ml_request = {
+                "dataset_id": request.dataset_id,
+                "dateColumn": request.date_column,
+                "targetColumn": request.target_column,
+                "exclude_columns": request.exclude_columns or [],
+                "test_size": request.test_size,
+                "max_memory_mb": request.max_memory_mb,
+                "processor_type": request.processor_type,
+                "delete_after_analysis": True  # Always clean up after analysis
+            }
+            
+            logger.info(f"Calling ML service at {ML_API_URL}/memory_efficient_analyze")
+            
+            # Use a longer timeout for ML analysis (5 minutes)
+            response = await http_request.app.state.ml_client.post(
+                f"{ML_API_URL}/memory_efficient_analyze",
+                json=ml_request,
+                timeout=300.0
+            )
+            
+            # Check for errors
+            if response.status_code != 200:
+                error_detail = "Unknown error"
+                try:
+                    error_data = response.json()
+                    error_detail = error_data.get("detail", error_detail)
+                except:
+                    error_detail = response.text
                 
-                # Use a longer timeout for ML analysis (5 minutes)
-                response = await client.post(
-                    f"{ML_API_URL}/memory_efficient_analyze",
-                    json=ml_request,
-                    timeout=300.0
+                logger.error(f"ML service error: {error_detail}")
+                raise HTTPException(
+                    status_code=response.status_code,
+                    detail=f"ML service error: {error_detail}"
                 )
-                
-                # Check for errors
-                if response.status_code != 200:
-                    error_detail = "Unknown error"
-                    try:
-                        error_data = response.json()
-                        error_detail = error_data.get("detail", error_detail)
-                    except:
-                        error_detail = response.text
-                    
-                    logger.error(f"ML service error: {error_detail}")
-                    raise HTTPException(
-                        status_code=response.status_code,
-                        detail=f"ML service error: {error_detail}"
-                    )
-                
-                # Parse and return the results
-                results = response.json()
-                logger.info("Memory-efficient ML analysis completed successfully")
-                
-                # Add resource usage information if available
-                resource_info = {}
-                if "resource_usage" in results:
-                    resource_info = {
-                        "peak_memory_mb": results["resource_usage"].get("peak_memory_mb", 0),
-                        "processing_time_seconds": results["resource_usage"].get("processing_time_seconds", 0),
-                        "processor_used": results.get("processor_used", "unknown")
-                    }
-                    
-                    # Add GCP free tier estimates if available
-                    if "estimated_monthly_usage" in results["resource_usage"]:
-                        resource_info["estimated_monthly_usage"] = results["resource_usage"]["estimated_monthly_usage"]
-                
-                return {
-                    "success": True,
-                    "dataset_id": request.dataset_id,
-                    "resource_usage": resource_info,
-                    "results": results
+            
+            # Parse and return the results
+            results = response.json()
+            logger.info("Memory-efficient ML analysis completed successfully")
+            
+            # Add resource usage information if available
+            resource_info = {}
+            if "resource_usage" in results:
+                resource_info = {
+                    "peak_memory_mb": results["resource_usage"].get("peak_memory_mb", 0),
+                    "processing_time_seconds": results["resource_usage"].get("processing_time_seconds", 0),
+                    "processor_used": results.get("processor_used", "unknown")
                 }
                 
+                # Add GCP free tier estimates if available
+                if "estimated_monthly_usage" in results["resource_usage"]:
+                    resource_info["estimated_monthly_usage"] = results["resource_usage"]["estimated_monthly_usage"]
+            
+            return {
+                "success": True,
+                "dataset_id": request.dataset_id,
+                "resource_usage": resource_info,
+                "results": results
+            }
+            
         except httpx.RequestError as e:
             logger.error(f"Error connecting to ML service: {str(e)}")
             raise HTTPException(
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import List, Optional, Dict, Any
+import hashlib
 import json
 import traceback
 
-from app.utils.redis_client import retrieve_data
+from app.utils.redis_client import retrieve_data, retrieve_metadata, get_cached_response, cache_response
 from app.utils.duckdb_query import query_parquet_data
+from app.utils.json_response import orjson_dumps
 
 router = APIRouter(
     prefix="/query",
@@ -48,8 +50,20 @@ async def query_dataset(
         print(f"date_column: {date_column}")
         print(f"target_column: {target_column}")
         
+        # Serve repeated queries from the response cache without fetching the dataset.
+        # The metadata is read first, so expired datasets are noticed, and is
+        # reused below to fetch the chunks on a cache miss.
+        params = [filters, limit, offset, sort_by, sort_order, date_column, target_column]
+        params_hash = hashlib.sha1(json.dumps(params).encode('utf-8')).hexdigest()
+        cache_key = f"{dataset_id}:query:{params_hash}"
+        metadata = await retrieve_metadata(dataset_id)
+        if metadata:
+            cached = await get_cached_response(cache_key)
+            if cached is not None:
+                return Response(content=cached, media_type="application/json")
+        
         # Retrieve data from Redis
-        data = await retrieve_data(dataset_id)
+        data = await retrieve_data(dataset_id, metadata=metadata)
         
         if not data:
             raise HTTPException(status_code=404, detail="Dataset not found or expired")
@@ -106,15 +120,18 @@ async def query_dataset(
             
             print(f"Query returned {len(result)} rows out of {data.get('row_count', 0)}")
             
-            # Return the result with metadata
-            return {
+            # Return the result with metadata; the rows are already JSON-native,
+            # so they go straight to orjson without a jsonable_encoder pass
+            body = orjson_dumps({
                 "success": True,
                 "dataset_id": dataset_id,
                 "filtered_row_count": len(result),
                 "total_row_count": data.get("row_count", 0),
                 "data": result,
                 "aggregated": aggregate is not None
-            }
+            })
+            await cache_response(cache_key, body)
+            return Response(content=body, media_type="application/json")
         except Exception as e:
             print(f"DuckDB query error: {str(e)}")
             print(traceback.format_exc())
@@ -132,8 +149,8 @@ async def query_dataset(
 async def get_dataset_metadata(dataset_id: str):
     """Get metadata about a dataset without retrieving the actual data"""
     try:
-        # Retrieve data from Redis
-        data = await retrieve_data(dataset_id)
+        # Retrieve only the metadata key, not the Parquet chunks
+        data = await retrieve_metadata(dataset_id)
         
         if not data:
             raise HTTPException(status_code=404, detail="Dataset not found or expired")
@@ -160,8 +177,8 @@ async def get_dataset_metadata(dataset_id: str):
 async def get_dataset_columns(dataset_id: str):
     """Get the columns of a dataset"""
     try:
-        # Retrieve data from Redis
-        data = await retrieve_data(dataset_id)
+        # Retrieve only the metadata key, not the Parquet chunks
+        data = await retrieve_metadata(dataset_id)
         
         if not data:
             raise HTTPException(status_code=404, detail="Dataset not found or expired")
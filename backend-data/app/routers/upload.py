@@ -4,6 +4,7 @@ import uuid
 import os
 import traceback
 from typing import Optional
+import pandas as pd
 
 from app.utils.csv_parser import parse_csv
 from app.utils.parquet_converter import convert_to_parquet
@@ -47,26 +48,26 @@ async def upload_file(
         
         # Parse CSV data
         try:
-            parsed_data = await parse_csv(contents)
+            df = await parse_csv(contents)
         except Exception as e:
             print(f"CSV parsing error: {str(e)}")
             raise HTTPException(status_code=400, detail=f"Failed to parse CSV: {str(e)}")
         
-        if not parsed_data or len(parsed_data) == 0:
+        if df.empty:
             raise HTTPException(status_code=400, detail="No data found in the CSV file")
         
-        # Get a sample row for column info
-        sample_row = parsed_data[0]
+        # Get a sample row (as Python scalars) for column info
+        sample_row = df.iloc[:1].to_dict(orient='records')[0]
         column_info = {col: str(type(val).__name__) for col, val in sample_row.items()}
         
-        print(f"Parsed {len(parsed_data)} rows with columns: {list(column_info.keys())}")
+        print(f"Parsed {len(df)} rows with columns: {list(column_info.keys())}")
         print(f"Column types: {column_info}")
         
         # Convert to Parquet (run in background to avoid blocking)
         background_tasks.add_task(
             process_and_store_data,
             dataset_id,
-            parsed_data,
+            df,
             file.filename
         )
         
@@ -84,8 +85,8 @@ async def upload_file(
             "dataset_id": dataset_id,
             "ttl_seconds": DEFAULT_TTL,
             "expiry_time": f"Data will be available for {expiry_text}",
-            "row_count_estimate": len(parsed_data),
-            "columns": list(sample_row.keys()) if parsed_data else [],
+            "row_count_estimate": len(df),
+            "columns": list(sample_row.keys()),
             "column_types": column_info
         }
         
@@ -97,7 +98,7 @@ async def upload_file(
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Failed to process the file: {str(e)}")
 
-async def process_and_store_data(dataset_id: str, data: list, filename: str):
+async def process_and_store_data(dataset_id: str, data: pd.DataFrame, filename: str):
     """Background task to convert data to Parquet and store in Redis"""
     try:
         # Convert to Parquet
@@ -119,7 +120,7 @@ async def process_and_store_data(dataset_id: str, data: list, filename: str):
                     "filename": filename,
                     "timestamp": str(uuid.uuid1()),
                     "row_count": len(data),
-                    "columns": list(data[0].keys()) if data else []
+                    "columns": data.columns.tolist()
                 }
             )
             
@@ -7,6 +7,12 @@ import json
 from typing import Dict, List, Any, Optional
 import traceback
 
+def _json_safe_value(value: Any) -> Any:
+    """Return value unchanged if JSON can carry it natively, else its string form."""
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return value
+    return str(value)
+
 async def query_parquet_data(
     parquet_data: bytes,
     filters: Dict[str, Dict[str, Any]] = None,
@@ -128,16 +134,16 @@ async def query_parquet_data(
                 fallback_query = f"SELECT * FROM data LIMIT {limit} OFFSET {offset}"
             result = con.execute(fallback_query).fetchdf()
         
-        # Convert to list of dictionaries
-        records = result.to_dict(orient='records')
-        
-        # Convert any non-serializable types to strings
-        for record in records:
-            for key, value in record.items():
-                if not isinstance(value, (str, int, float, bool, type(None))):
-                    record[key] = str(value)
+        # Convert any non-serializable types to strings. Numeric and bool
+        # columns always become native Python scalars (or None), so only the
+        # remaining columns need a per-value check
+        for column in result.columns:
+            if pd.api.types.is_numeric_dtype(result[column].dtype):
+                continue
+            result[column] = result[column].map(_json_safe_value)
         
-        return records
+        # Convert to list of dictionaries
+        return result.to_dict(orient='records')
     except Exception as e:
         print(f"Error querying data: {str(e)}")
         print(traceback.format_exc())
@@ -0,0 +1,23 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+# Same options FastAPI's ORJSONResponse used: non-string dict keys and NumPy
+# scalars/arrays are serialized natively
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def orjson_dumps(content: Any) -> bytes:
+    """Serialize content to JSON bytes with orjson."""
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+class OrjsonResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+    
+    Replaces fastapi.responses.ORJSONResponse, which is deprecated in newer
+    FastAPI releases.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return orjson_dumps(content)
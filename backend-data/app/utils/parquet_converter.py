@@ -1,49 +1,55 @@
 import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 import io
 import numpy as np
 
-async def convert_to_parquet(data: List[Dict[str, Any]]) -> pa.Buffer:
+async def convert_to_parquet(data: Union[List[Dict[str, Any]], pd.DataFrame]) -> pa.Buffer:
     """
-    Convert a list of dictionaries to Parquet format.
+    Convert a DataFrame or a list of dictionaries to Parquet format.
     
     Args:
-        data: List of dictionaries, each representing a row
+        data: DataFrame, or list of dictionaries each representing a row.
+            A DataFrame is cleaned in place.
         
     Returns:
         PyArrow Buffer containing the Parquet data
     """
     try:
         # Convert to pandas DataFrame
-        df = pd.DataFrame(data)
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
         
-        # Pre-process problematic columns and convert object types to strings
-        for column in df.columns:
-            # Specifically handle StateHoliday column (the one from the error)
-            if column == 'StateHoliday':
-                df[column] = df[column].astype(str)
-            
-            # Handle all object types by converting to strings
-            if df[column].dtype == 'object':
-                df[column] = df[column].astype(str)
-            
-            # Handle any nan values
-            if df[column].isna().any():
-                if pd.api.types.is_numeric_dtype(df[column]):
-                    # For numeric columns, replace NaN with 0
-                    df[column] = df[column].fillna(0)
-                else:
-                    # For non-numeric columns, replace NaN with empty string
-                    df[column] = df[column].fillna('')
+        # Pre-process problematic columns: StateHoliday (the one from the error)
+        # and all object types are converted to strings as one block
+        string_columns = [
+            column for column in df.columns
+            if column == 'StateHoliday' or df[column].dtype == 'object'
+        ]
+        if string_columns:
+            df[string_columns] = df[string_columns].astype(str)
+        
+        # Handle any nan values, finding the affected columns in a single pass
+        nan_columns = df.columns[df.isna().any()]
+        numeric_columns = [
+            column for column in nan_columns
+            if pd.api.types.is_numeric_dtype(df[column])
+        ]
+        other_columns = [column for column in nan_columns if column not in numeric_columns]
+        if numeric_columns:
+            # For numeric columns, replace NaN with 0
+            df[numeric_columns] = df[numeric_columns].fillna(0)
+        if other_columns:
+            # For non-numeric columns, replace NaN with empty string
+            df[other_columns] = df[other_columns].fillna('')
         
         # Convert to PyArrow Table with string type for object columns
         table = pa.Table.from_pandas(df)
         
-        # Write to in-memory buffer
+        # Write to in-memory buffer; zstd pages are smaller than the default
+        # snappy, so fewer Redis chunks are uploaded and fetched per dataset
         buffer = io.BytesIO()
-        pq.write_table(table, buffer)
+        pq.write_table(table, buffer, compression='zstd')
         
         # Get the buffer content
         buffer.seek(0)
@@ -55,7 +61,8 @@ async def convert_to_parquet(data: List[Dict[str, Any]]) -> pa.Buffer:
         # Fallback to JSON as bytes
         try:
             print("Attempting fallback to JSON format")
-            json_data = pd.DataFrame(data).to_json(orient='records')
+            df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+            json_data = df.to_json(orient='records')
             return pa.py_buffer(json_data.encode('utf-8'))
         except Exception as fallback_error:
             print(f"Fallback to JSON also failed: {str(fallback_error)}")
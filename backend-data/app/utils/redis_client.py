@@ -1,13 +1,18 @@
-import json
 import os
 from typing import Dict, Any, Optional
 import asyncio
 import base64
-import time
 import traceback
+import orjson
 from dotenv import load_dotenv
 from upstash_redis import Redis
 
+# orjson parses bytes directly and serializes several times faster than the stdlib
+json_loads = orjson.loads
+
+def json_dumps(obj: Any) -> str:
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -69,6 +74,10 @@ if redis_client is None:
             print(f"MockRedis: Getting {key}")
             return self.data.get(key)
             
+        def delete(self, *keys):
+            print(f"MockRedis: Deleting {len(keys)} keys")
+            return sum(self.data.pop(key, None) is not None for key in keys)
+            
         def ping(self):
             print("MockRedis: PING")
             return True
@@ -79,9 +88,92 @@ if redis_client is None:
 # Upstash has a 1MB (1048576 bytes) limit, so we'll use ~700KB as base
 MAX_CHUNK_SIZE = 700 * 1024  # ~700KB which becomes ~933KB after base64 encoding
 
+# Number of chunk uploads allowed in flight at once for a single dataset
+MAX_CONCURRENT_UPLOADS = 4
+
+# The Upstash SDK client is synchronous (one HTTP request per command), so every
+# call made from a request handler goes through asyncio.to_thread to keep the
+# event loop free while waiting on Redis.
+
 # Fixed TTL for all data (15 minutes = 900 seconds)
 DEFAULT_TTL = 900  # 15 minutes
 
+# TTL for cached query responses; kept shorter than the dataset TTL
+QUERY_CACHE_TTL = 300  # 5 minutes
+
+async def _store_chunk(key: str, parquet_data: memoryview, i: int, start: int, end: int, metadata: Dict[str, Any]) -> int:
+    """
+    Store one base64-encoded chunk of Parquet data, splitting it into
+    sub-chunks if Upstash rejects it as too large.
+    
+    Args:
+        key: Redis key of the dataset
+        parquet_data: View over the full Parquet data; chunks are sliced from it without copying
+        i: Chunk index
+        start: Start offset of the chunk in parquet_data
+        end: End offset of the chunk in parquet_data
+        metadata: Dataset metadata; split chunks are recorded in it
+        
+    Returns:
+        Number of Redis keys written, 0 on failure
+    """
+    chunk = parquet_data[start:end]
+    chunk_size_actual = len(chunk)
+    chunk_key = f"{key}:chunk:{i}"
+    print(f"Storing chunk {i} for key {chunk_key}, size: {chunk_size_actual} bytes")
+    
+    try:
+        # Use base64 encoding for binary data
+        encoded_chunk = base64.b64encode(chunk).decode('utf-8')
+        encoded_size = len(encoded_chunk)
+        print(f"Encoded chunk to base64 string, new size: {encoded_size} bytes")
+        
+        if encoded_size >= 1000000:  # Close to 1MB limit
+            print(f"WARNING: Encoded chunk size ({encoded_size}) is close to Upstash limit (1MB)")
+        
+        # Store the base64 encoded string
+        chunk_result = await asyncio.to_thread(redis_client.set, chunk_key, encoded_chunk, ex=DEFAULT_TTL)
+        print(f"Chunk {i} storage result: {chunk_result}")
+        if not chunk_result:
+            print(f"Failed to store chunk {i} for key {key}")
+            return 0
+        
+        return 1
+    except Exception as e:
+        print(f"Error storing chunk {i}: {str(e)}")
+        print(traceback.format_exc())
+        
+        # If we hit a size limit, try with a smaller chunk
+        if "max request size exceeded" not in str(e).lower():
+            return 0
+        
+        # Calculate a smaller size for this chunk
+        retry_size = int(chunk_size_actual * 0.7)  # 70% of original size
+        print(f"Retrying with smaller chunk size: {retry_size} bytes")
+        
+        # Split this chunk further
+        num_parts = (chunk_size_actual + retry_size - 1) // retry_size
+        for j in range(num_parts):
+            sub_start = start + j * retry_size
+            sub_end = min(sub_start + retry_size, end)
+            sub_chunk = parquet_data[sub_start:sub_end]
+            sub_key = f"{key}:chunk:{i}:{j}"
+            
+            try:
+                sub_encoded = base64.b64encode(sub_chunk).decode('utf-8')
+                sub_result = await asyncio.to_thread(redis_client.set, sub_key, sub_encoded, ex=DEFAULT_TTL)
+                if not sub_result:
+                    print(f"Failed to store sub-chunk {i}:{j}")
+                    return 0
+            except Exception as sub_e:
+                print(f"Error storing sub-chunk {i}:{j}: {str(sub_e)}")
+                return 0
+        
+        # Record in the metadata that this chunk is split
+        metadata[f"chunk_{i}_split"] = True
+        metadata[f"chunk_{i}_parts"] = num_parts
+        return num_parts
+
 async def store_data(key: str, data: Dict[str, Any]) -> bool:
     """
     Store data in Redis with a fixed TTL of 15 minutes.
@@ -116,114 +208,58 @@ async def store_data(key: str, data: Dict[str, Any]) -> bool:
             
             # Remove Parquet data from the metadata to store separately
             metadata = {k: v for k, v in data.items() if k != "parquet_data"}
-            
-            # Store metadata
             meta_key = f"{key}:meta"
-            print(f"Storing metadata for key: {meta_key}")
-            try:
-                meta_result = redis_client.set(meta_key, json.dumps(metadata), ex=DEFAULT_TTL)
-                print(f"Metadata storage result: {meta_result}")
-                if not meta_result:
-                    print(f"Failed to store metadata for key {key}")
-                    return False
-            except Exception as e:
-                print(f"Error storing metadata: {str(e)}")
-                print(traceback.format_exc())
-                return False
             
             # Calculate number of chunks needed
             total_size = len(parquet_data)
             num_chunks = (total_size + chunk_size - 1) // chunk_size
             print(f"Splitting data into {num_chunks} chunks")
             
-            # Update metadata with chunk info
+            # Add chunk info to the metadata; it is written once, after all chunks,
+            # so readers never see metadata for a partially stored dataset
             metadata["total_chunks"] = num_chunks
             metadata["total_size"] = total_size
             metadata["chunk_size"] = chunk_size
             
+            # Store data in chunks, keeping up to MAX_CONCURRENT_UPLOADS SETs in
+            # flight; a chunk is only encoded once it holds a slot
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+            parquet_view = memoryview(parquet_data)
+            
+            async def store_chunk_bounded(i: int) -> int:
+                async with semaphore:
+                    start = i * chunk_size
+                    end = min(start + chunk_size, total_size)
+                    return await _store_chunk(key, parquet_view, i, start, end, metadata)
+            
+            stored = await asyncio.gather(*(store_chunk_bounded(i) for i in range(num_chunks)))
+            if not all(stored):
+                return False
+            successful_chunks = sum(stored)
+            
+            print(f"Successfully stored all {successful_chunks} chunks for key {key}")
+            
+            # Store metadata
+            print(f"Storing metadata for key: {meta_key}")
             try:
-                meta_update_result = redis_client.set(meta_key, json.dumps(metadata), ex=DEFAULT_TTL)
-                print(f"Metadata update result: {meta_update_result}")
-                if not meta_update_result:
-                    print(f"Failed to update metadata with chunk info for key {key}")
+                meta_result = await asyncio.to_thread(redis_client.set, meta_key, json_dumps(metadata), ex=DEFAULT_TTL)
+                print(f"Metadata storage result: {meta_result}")
+                if not meta_result:
+                    print(f"Failed to store metadata for key {key}")
                     return False
             except Exception as e:
-                print(f"Error updating metadata: {str(e)}")
+                print(f"Error storing metadata: {str(e)}")
                 print(traceback.format_exc())
                 return False
             
-            # Store data in chunks
-            successful_chunks = 0
-            for i in range(num_chunks):
-                start = i * chunk_size
-                end = min(start + chunk_size, total_size)
-                chunk = parquet_data[start:end]
-                chunk_size_actual = len(chunk)
-                chunk_key = f"{key}:chunk:{i}"
-                print(f"Storing chunk {i} for key {chunk_key}, size: {chunk_size_actual} bytes")
-                
-                try:
-                    # Use base64 encoding for binary data
-                    encoded_chunk = base64.b64encode(chunk).decode('utf-8')
-                    encoded_size = len(encoded_chunk)
-                    print(f"Encoded chunk to base64 string, new size: {encoded_size} bytes")
-                    
-                    if encoded_size >= 1000000:  # Close to 1MB limit
-                        print(f"WARNING: Encoded chunk size ({encoded_size}) is close to Upstash limit (1MB)")
-                    
-                    # Store the base64 encoded string
-                    chunk_result = redis_client.set(chunk_key, encoded_chunk, ex=DEFAULT_TTL)
-                    print(f"Chunk {i} storage result: {chunk_result}")
-                    if not chunk_result:
-                        print(f"Failed to store chunk {i} for key {key}")
-                        return False
-                    
-                    successful_chunks += 1
-                except Exception as e:
-                    print(f"Error storing chunk {i}: {str(e)}")
-                    print(traceback.format_exc())
-                    
-                    # If we hit a size limit, try with a smaller chunk
-                    if "max request size exceeded" in str(e).lower():
-                        # Calculate a smaller size for this chunk
-                        retry_size = int(chunk_size_actual * 0.7)  # 70% of original size
-                        print(f"Retrying with smaller chunk size: {retry_size} bytes")
-                        
-                        # Split this chunk further
-                        for j in range((chunk_size_actual + retry_size - 1) // retry_size):
-                            sub_start = start + j * retry_size
-                            sub_end = min(sub_start + retry_size, end)
-                            sub_chunk = parquet_data[sub_start:sub_end]
-                            sub_key = f"{key}:chunk:{i}:{j}"
-                            
-                            try:
-                                sub_encoded = base64.b64encode(sub_chunk).decode('utf-8')
-                                sub_result = redis_client.set(sub_key, sub_encoded, ex=DEFAULT_TTL)
-                                if not sub_result:
-                                    print(f"Failed to store sub-chunk {i}:{j}")
-                                    return False
-                                
-                                # Update metadata to indicate this chunk is split
-                                metadata[f"chunk_{i}_split"] = True
-                                metadata[f"chunk_{i}_parts"] = (chunk_size_actual + retry_size - 1) // retry_size
-                                redis_client.set(meta_key, json.dumps(metadata), ex=DEFAULT_TTL)
-                                
-                                successful_chunks += 1
-                            except Exception as sub_e:
-                                print(f"Error storing sub-chunk {i}:{j}: {str(sub_e)}")
-                                return False
-                    else:
-                        return False
-                
-            print(f"Successfully stored all {successful_chunks} chunks for key {key}")
             return True
         else:
             # Store regular data
             print(f"Storing regular data for key {key}")
             try:
                 # Convert data to JSON if it's a dictionary
-                data_to_store = json.dumps(data) if isinstance(data, (dict, list)) else data
-                result = redis_client.set(key, data_to_store, ex=DEFAULT_TTL)
+                data_to_store = json_dumps(data) if isinstance(data, (dict, list)) else data
+                result = await asyncio.to_thread(redis_client.set, key, data_to_store, ex=DEFAULT_TTL)
                 print(f"Regular data storage result: {result}")
                 return result
             except Exception as e:
@@ -236,12 +272,13 @@ async def store_data(key: str, data: Dict[str, Any]) -> bool:
         print(traceback.format_exc())
         return False
 
-async def retrieve_data(key: str) -> Optional[Dict[str, Any]]:
+async def retrieve_data(key: str, metadata: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
     """
     Retrieve data from Redis.
     
     Args:
         key: Redis key
+        metadata: Metadata already fetched for the key, to skip looking it up again
         
     Returns:
         Data if found, None otherwise
@@ -251,13 +288,16 @@ async def retrieve_data(key: str) -> Optional[Dict[str, Any]]:
         
         # Check if this is chunked data
         meta_key = f"{key}:meta"
-        try:
-            metadata_raw = redis_client.get(meta_key)
-            print(f"Metadata retrieval result: {metadata_raw is not None}")
-        except Exception as e:
-            print(f"Error retrieving metadata: {str(e)}")
-            print(traceback.format_exc())
-            metadata_raw = None
+        if metadata is not None:
+            metadata_raw = metadata
+        else:
+            try:
+                metadata_raw = await asyncio.to_thread(redis_client.get, meta_key)
+                print(f"Metadata retrieval result: {metadata_raw is not None}")
+            except Exception as e:
+                print(f"Error retrieving metadata: {str(e)}")
+                print(traceback.format_exc())
+                metadata_raw = None
         
         if metadata_raw:
             print(f"Found metadata for key: {meta_key}")
@@ -265,9 +305,9 @@ async def retrieve_data(key: str) -> Optional[Dict[str, Any]]:
             # Parse metadata
             try:
                 if isinstance(metadata_raw, bytes):
-                    metadata = json.loads(metadata_raw.decode('utf-8'))
+                    metadata = json_loads(metadata_raw)
                 elif isinstance(metadata_raw, str):
-                    metadata = json.loads(metadata_raw)
+                    metadata = json_loads(metadata_raw)
                 else:
                     # Assuming already parsed JSON
                     metadata = metadata_raw
@@ -295,7 +335,7 @@ async def retrieve_data(key: str) -> Optional[Dict[str, Any]]:
                             print(f"Retrieving sub-chunk {j} for key {sub_key}")
                             
                             try:
-                                encoded_sub_chunk = redis_client.get(sub_key)
+                                encoded_sub_chunk = await asyncio.to_thread(redis_client.get, sub_key)
                                 if not encoded_sub_chunk:
                                     print(f"Missing sub-chunk {i}:{j} for key {key}")
                                     raise Exception(f"Missing sub-chunk {i}:{j} for key {key}")
@@ -323,7 +363,7 @@ async def retrieve_data(key: str) -> Optional[Dict[str, Any]]:
                         
                         try:
                             # Get the base64 encoded chunk
-                            encoded_chunk = redis_client.get(chunk_key)
+                            encoded_chunk = await asyncio.to_thread(redis_client.get, chunk_key)
                             if not encoded_chunk:
                                 print(f"Missing chunk {i} for key {key}")
                                 raise Exception(f"Missing chunk {i} for key {key}")
@@ -357,7 +397,7 @@ async def retrieve_data(key: str) -> Optional[Dict[str, Any]]:
             print(f"No metadata found, trying regular key: {key}")
             
             try:
-                data_raw = redis_client.get(key)
+                data_raw = await asyncio.to_thread(redis_client.get, key)
                 print(f"Regular data retrieval result: {data_raw is not None}")
             except Exception as e:
                 print(f"Error retrieving regular data: {str(e)}")
@@ -371,14 +411,14 @@ async def retrieve_data(key: str) -> Optional[Dict[str, Any]]:
                     if isinstance(data_raw, bytes):
                         try:
                             # Try to decode as JSON
-                            return json.loads(data_raw.decode('utf-8'))
+                            return json_loads(data_raw)
                         except:
                             # If not JSON, return as is
                             return {"data": data_raw}
                     elif isinstance(data_raw, str):
                         try:
                             # Try to parse as JSON
-                            return json.loads(data_raw)
+                            return json_loads(data_raw)
                         except:
                             # If not JSON, return as is
                             return {"data": data_raw}
@@ -396,4 +436,66 @@ async def retrieve_data(key: str) -> Optional[Dict[str, Any]]:
     except Exception as e:
         print(f"Error retrieving data from Redis: {str(e)}")
         print(traceback.format_exc())
-        return None 
\ No newline at end of file
+        return None 
+
+async def get_cached_response(cache_key: str) -> Optional[bytes]:
+    """
+    Retrieve a cached JSON response body for a dataset.
+    
+    Callers must check that the dataset still exists first, so responses are
+    never served for a dataset that has expired or been deleted.
+    
+    Args:
+        cache_key: Redis key of the cached response
+        
+    Returns:
+        Response body bytes if cached, None otherwise
+    """
+    try:
+        body = await asyncio.to_thread(redis_client.get, cache_key)
+        if body is None:
+            return None
+        
+        print(f"Cache hit for key: {cache_key}")
+        return body.encode('utf-8') if isinstance(body, str) else body
+    except Exception as e:
+        print(f"Error reading cached response: {str(e)}")
+        return None
+
+async def cache_response(cache_key: str, body: bytes, ttl: int = QUERY_CACHE_TTL) -> bool:
+    """
+    Store a JSON response body in Redis.
+    
+    Args:
+        cache_key: Redis key for the response
+        body: Serialized JSON response body
+        ttl: Time to live in seconds
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        return bool(await asyncio.to_thread(redis_client.set, cache_key, body.decode('utf-8'), ex=ttl))
+    except Exception as e:
+        print(f"Error caching response: {str(e)}")
+        return False
+
+async def retrieve_metadata(dataset_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Retrieve only the metadata of a dataset, without fetching its Parquet chunks.
+    
+    Args:
+        dataset_id: ID of the dataset
+        
+    Returns:
+        Metadata if found, None otherwise
+    """
+    try:
+        metadata_raw = await asyncio.to_thread(redis_client.get, f"{dataset_id}:meta")
+        if not metadata_raw:
+            return None
+        return json_loads(metadata_raw) if isinstance(metadata_raw, (bytes, str)) else metadata_raw
+    except Exception as e:
+        print(f"Error retrieving metadata for {dataset_id}: {str(e)}")
+        print(traceback.format_exc())
+        return None
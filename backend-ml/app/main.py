@@ -19,6 +19,10 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Headless server: use the non-interactive Agg backend for the SHAP plots. Set
+# before the routers import shap and pyplot, unless overridden in the environment.
+os.environ.setdefault("MPLBACKEND", "Agg")
+
 # Create FastAPI app
 app = FastAPI(
     title="ML Analysis API",
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 import asyncio
 import logging
 import traceback
 import time
+import hashlib
+import json
+import math
 from datetime import datetime
 import pandas as pd
 import numpy as np
@@ -14,7 +20,7 @@ from .model import AnalysisRequest, RedisAnalysisRequest, MemoryEfficientAnalysi
 # Import utilities
 from ..utils.analysis import analyze_data
 from ..utils.redis_client import retrieve_parquet_data, delete_dataset
-from ..utils.duckdb_processor import process_parquet_for_ml, filter_data_by_column_types
+from ..utils.duckdb_processor import process_parquet_for_ml
 from ..utils.memory_efficient_ml import MemoryEfficientML
 
 # Configure logging
@@ -23,9 +29,82 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter(tags=["analysis"])
 
+# LRU cache of serialized analysis responses, keyed by a fingerprint of the
+# input data and the analysis parameters. Re-submitting identical data skips
+# model training, SHAP and plot rendering entirely. Bodies carry several
+# base64 PNGs, so the cache is bounded by total bytes rather than entry count.
+RESULTS_CACHE_MAX_BYTES = 32 * 1024 * 1024
+_results_cache: "OrderedDict[bytes, bytes]" = OrderedDict()
+_results_cache_bytes = 0
+
+def _results_cache_key(data: bytes, *params: Any) -> bytes:
+    """Fingerprint raw input bytes together with the analysis parameters."""
+    h = hashlib.blake2b(data, digest_size=16)
+    h.update(json.dumps(params, default=str).encode())
+    return h.digest()
+
+def _get_cached_results(key: bytes) -> Optional[bytes]:
+    body = _results_cache.get(key)
+    if body is not None:
+        _results_cache.move_to_end(key)
+    return body
+
+def _cache_results(key: bytes, results: Dict[str, Any]) -> bytes:
+    """Serialize results once and store the JSON bytes in the LRU cache."""
+    global _results_cache_bytes
+    body = JSONResponse(content=jsonable_encoder(results)).body
+    if len(body) > RESULTS_CACHE_MAX_BYTES:
+        return body
+    previous = _results_cache.pop(key, None)
+    if previous is not None:
+        _results_cache_bytes -= len(previous)
+    _results_cache[key] = body
+    _results_cache_bytes += len(body)
+    while _results_cache_bytes > RESULTS_CACHE_MAX_BYTES:
+        _, evicted = _results_cache.popitem(last=False)
+        _results_cache_bytes -= len(evicted)
+    return body
+
+def _with_timing(body: bytes, timing: Dict[str, float]) -> bytes:
+    """Splice a "timing" entry into a serialized results object."""
+    separator = b',' if body != b'{}' else b''
+    return body[:-1] + separator + b'"timing":' + json.dumps(timing).encode() + b'}'
+
+def _sanitize_float(val: float) -> float:
+    return float(val) if math.isfinite(val) else 0.0
+
+def _sanitize_dict(val: dict) -> dict:
+    return {k: _sanitize_value(v) for k, v in val.items()}
+
+def _sanitize_list(val: list) -> list:
+    return [_sanitize_value(item) for item in val]
+
+# Dispatch on the exact type first rather than walking an isinstance chain for
+# every value; NaN/inf floats become 0.0 so the result is valid JSON.
+_SANITIZERS = {
+    float: _sanitize_float,
+    np.float64: _sanitize_float,
+    np.float32: _sanitize_float,
+    dict: _sanitize_dict,
+    list: _sanitize_list,
+}
+
+def _sanitize_value(val: Any) -> Any:
+    sanitize = _SANITIZERS.get(type(val))
+    if sanitize is not None:
+        return sanitize(val)
+    # Subclasses and other NumPy float types fall back to isinstance checks
+    if isinstance(val, (float, np.floating)):
+        return _sanitize_float(val)
+    if isinstance(val, dict):
+        return _sanitize_dict(val)
+    if isinstance(val, list):
+        return _sanitize_list(val)
+    return val
+
 # Define API endpoints
 @router.post("/analyze")
-async def analyze(request: AnalysisRequest):
+async def analyze(request: AnalysisRequest, http_request: Request):
     """Analyze time series data using XGBoost and SHAP."""
     try:
         logger.info(f"Analyzing data with {len(request.data)} records")
@@ -37,6 +116,14 @@ async def analyze(request: AnalysisRequest):
             sample_row = request.data[0]
             logger.info(f"Available columns: {list(sample_row.keys())}")
         
+        # The raw body already holds the data and parameters; FastAPI keeps it
+        # after validation, so hashing it avoids re-serializing the records
+        cache_key = _results_cache_key(await http_request.body())
+        cached = _get_cached_results(cache_key)
+        if cached is not None:
+            logger.info("Returning cached analysis results")
+            return Response(content=cached, media_type="application/json")
+        
         results = analyze_data(
             request.data, 
             request.dateColumn, 
@@ -44,7 +131,8 @@ async def analyze(request: AnalysisRequest):
             request.multipleWaterfallPlots
         )
         
-        return results
+        body = _cache_results(cache_key, results)
+        return Response(content=body, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Error analyzing data: {str(e)}", exc_info=True)
@@ -76,20 +164,36 @@ async def analyze_from_redis(request: RedisAnalysisRequest):
         redis_time = time.time()
         logger.info(f"Retrieved {len(parquet_data)} bytes from Redis in {redis_time - start_time:.2f} seconds")
         
+        # Serve identical data/parameter combinations from the results cache
+        cache_key = _results_cache_key(
+            parquet_data,
+            request.dateColumn,
+            request.targetColumn,
+            request.multipleWaterfallPlots,
+            request.exclude_columns
+        )
+        cached = _get_cached_results(cache_key)
+        if cached is not None:
+            logger.info(f"Returning cached analysis results for dataset ID: {request.dataset_id}")
+            if request.delete_after_analysis:
+                await delete_dataset(request.dataset_id)
+            timing = {
+                "redis_retrieval_seconds": redis_time - start_time,
+                "processing_seconds": 0.0,
+                "analysis_seconds": 0.0,
+                "total_seconds": time.time() - start_time
+            }
+            return Response(content=_with_timing(cached, timing), media_type="application/json")
+        
         # Step 2: Process the Parquet data using DuckDB to select relevant columns
         try:
+            # Only numeric columns (plus date and target) are read from the Parquet
             df = await process_parquet_for_ml(
                 parquet_data, 
                 request.dateColumn, 
                 request.targetColumn, 
-                request.exclude_columns
-            )
-            
-            # Further filter to only include numeric columns
-            df = await filter_data_by_column_types(
-                df, 
-                request.dateColumn, 
-                request.targetColumn
+                request.exclude_columns,
+                numeric_only=True
             )
             
             logger.info(f"Processed data shape: {df.shape}")
@@ -104,13 +208,9 @@ async def analyze_from_redis(request: RedisAnalysisRequest):
         processing_time = time.time()
         logger.info(f"Processed parquet data in {processing_time - redis_time:.2f} seconds")
         
-        # Step 3: Convert DataFrame to list of dictionaries
-        records = df.to_dict(orient='records')
-        logger.info(f"Converted DataFrame to {len(records)} records")
-        
-        # Step 4: Analyze the data
+        # Step 3: Analyze the data (the DataFrame is passed through as-is)
         results = analyze_data(
-            records, 
+            df, 
             request.dateColumn, 
             request.targetColumn, 
             request.multipleWaterfallPlots
@@ -119,7 +219,7 @@ async def analyze_from_redis(request: RedisAnalysisRequest):
         analysis_time = time.time()
         logger.info(f"Analyzed data in {analysis_time - processing_time:.2f} seconds")
         
-        # Step 5: Delete data from Redis if requested
+        # Step 4: Delete data from Redis if requested
         if request.delete_after_analysis:
             success = await delete_dataset(request.dataset_id)
             if success:
@@ -127,16 +227,16 @@ async def analyze_from_redis(request: RedisAnalysisRequest):
             else:
                 logger.warning(f"Failed to delete dataset {request.dataset_id} from Redis")
         
-        # Add timing information to results
+        # Cache the results without timing, then add this run's timing
+        body = _cache_results(cache_key, results)
         total_time = time.time() - start_time
-        results["timing"] = {
+        timing = {
             "redis_retrieval_seconds": redis_time - start_time,
             "processing_seconds": processing_time - redis_time,
             "analysis_seconds": analysis_time - processing_time,
             "total_seconds": total_time
         }
-        
-        return results
+        return Response(content=_with_timing(body, timing), media_type="application/json")
         
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -194,19 +294,7 @@ async def memory_efficient_analyze(request: MemoryEfficientAnalysisRequest):
             logger.info(f"Memory-efficient analysis completed successfully with processor: {result.get('processor_type', 'unknown')}")
             
             # Sanitize the result to handle any infinite or NaN values
-            def sanitize_value(val):
-                if isinstance(val, float):
-                    if np.isnan(val) or np.isinf(val):
-                        return 0.0
-                    return float(val)
-                elif isinstance(val, dict):
-                    return {k: sanitize_value(v) for k, v in val.items()}
-                elif isinstance(val, list):
-                    return [sanitize_value(item) for item in val]
-                return val
-            
-            # Apply sanitization to the entire result dictionary
-            result = sanitize_value(result)
+            result = _sanitize_value(result)
             
         except ValueError as ve:
             raise HTTPException(
@@ -6,32 +6,54 @@ import matplotlib.pyplot as plt
 import base64
 from io import BytesIO
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
+from .metrics import regression_metrics
 import json
 import os
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 import logging
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def train_xgboost_model(data: List[Dict[str, Any]], date_column: str, target_column: str, test_size: float = 0.2, random_state: int = 42):
+# Raster resolution for base64 PNG plots; lower dpi keeps encode time and payload small.
+# Force plots are wide and text-heavy, so they get a little more resolution.
+PLOT_DPI = 72
+FORCE_PLOT_DPI = 96
+
+# XGBoost device: "cpu" by default, set XGB_DEVICE=cuda on GPU hosts
+XGB_DEVICE = os.getenv("XGB_DEVICE", "cpu")
+
+# Hyperparameters for the analysis model
+XGB_PARAMS = {
+    "tree_method": "hist",
+    "device": XGB_DEVICE,
+    "n_estimators": 100,
+    "learning_rate": 0.1,
+    "max_depth": 5,
+}
+
+def train_xgboost_model(data: Union[List[Dict[str, Any]], pd.DataFrame], date_column: str, target_column: str, test_size: float = 0.2, random_state: int = 42):
     """
     Train an XGBoost regression model on the provided data.
     
     Args:
-        data: List of dictionaries containing the data
+        data: List of dictionaries or a DataFrame containing the data
         date_column: Name of the date column
         target_column: Name of the target column
         test_size: Proportion of data to use for testing
         random_state: Random seed for reproducibility
         
     Returns:
-        Dictionary containing model, features, X_train, X_test, y_train, y_test, and metrics
+        Dictionary containing model, features, X_test (DataFrame), y_test (array), y_pred_test, and metrics
     """
-    # Convert to DataFrame
-    df = pd.DataFrame(data)
+    # Convert to DataFrame (records share the first row's keys)
+    if isinstance(data, pd.DataFrame):
+        df = data
+    elif data:
+        df = pd.DataFrame.from_records(data, columns=list(data[0].keys()))
+    else:
+        df = pd.DataFrame(data)
     
     logger.info(f"Training XGBoost model with date column: '{date_column}' and target column: '{target_column}'")
     logger.info(f"DataFrame columns: {df.columns.tolist()}")
@@ -76,32 +98,33 @@ def train_xgboost_model(data: List[Dict[str, Any]], date_column: str, target_col
         features = pd.get_dummies(features, columns=categorical_columns, drop_first=True)
         logger.info(f"After one-hot encoding, feature columns: {features.columns.tolist()}")
     
-    # Split the data into training and testing sets
-    X_train, X_test, y_train, y_test = train_test_split(
-        features, target, test_size=test_size, random_state=random_state
+    # Split row indices rather than frames; the same shuffle as splitting the frames directly
+    train_idx, test_idx = train_test_split(
+        np.arange(len(features)), test_size=test_size, random_state=random_state
     )
     
-    logger.info(f"Training set size: {len(X_train)}, Test set size: {len(X_test)}")
+    # XGBoost works in float32 internally, so one contiguous float32 matrix is
+    # lossless and avoids per-split frame copies and float64->float32 conversions.
+    # Training and metrics use plain array slices; only the test rows are kept as
+    # a DataFrame, for the SHAP plots' feature names and values.
+    X = features.to_numpy(dtype=np.float32)
+    y = target.to_numpy(dtype=np.float64)
+    X_train = X[train_idx]
+    y_train, y_test = y[train_idx], y[test_idx]
+    
+    logger.info(f"Training set size: {len(train_idx)}, Test set size: {len(test_idx)}")
     
     # Train the XGBoost model
-    model = xgb.XGBRegressor(
-        tree_method='hist',
-        n_estimators=100,
-        learning_rate=0.1,
-        max_depth=5,
-        random_state=random_state
-    )
+    model = xgb.XGBRegressor(**XGB_PARAMS, random_state=random_state)
     model.fit(X_train, y_train)
     
     # Make predictions
     y_pred_train = model.predict(X_train)
-    y_pred_test = model.predict(X_test)
+    y_pred_test = model.predict(X[test_idx])
     
     # Calculate metrics
-    train_rmse = np.sqrt(mean_squared_error(y_train, y_pred_train))
-    test_rmse = np.sqrt(mean_squared_error(y_test, y_pred_test))
-    train_r2 = r2_score(y_train, y_pred_train)
-    test_r2 = r2_score(y_test, y_pred_test)
+    train_rmse, train_r2 = regression_metrics(y_train, y_pred_train)
+    test_rmse, test_r2 = regression_metrics(y_test, y_pred_test)
     
     metrics = {
         'train_rmse': float(train_rmse),
@@ -115,10 +138,9 @@ def train_xgboost_model(data: List[Dict[str, Any]], date_column: str, target_col
     return {
         'model': model,
         'features': features.columns.tolist(),
-        'X_train': X_train,
-        'X_test': X_test,
-        'y_train': y_train,
+        'X_test': features.iloc[test_idx],
         'y_test': y_test,
+        'y_pred_test': y_pred_test,
         'metrics': metrics
     }
 
@@ -137,8 +159,8 @@ def generate_shap_plots(model_data: Dict[str, Any], multiple_waterfall_plots: bo
     X_test = model_data['X_test']
     y_test = model_data['y_test']
     
-    # Create a SHAP explainer
-    explainer = shap.Explainer(model)
+    # Create a SHAP explainer (native TreeSHAP, no model-type dispatch)
+    explainer = shap.TreeExplainer(model)
     shap_values = explainer(X_test, check_additivity=False)
     
     # Generate and save plots
@@ -149,7 +171,7 @@ def generate_shap_plots(model_data: Dict[str, Any], multiple_waterfall_plots: bo
     shap.summary_plot(shap_values, X_test, show=False)
     buf = BytesIO()
     plt.tight_layout()
-    plt.savefig(buf, format='png', dpi=100)
+    plt.savefig(buf, format='png', dpi=PLOT_DPI)
     plt.close()
     plots['summary_plot'] = base64.b64encode(buf.getvalue()).decode('utf-8')
     
@@ -158,7 +180,7 @@ def generate_shap_plots(model_data: Dict[str, Any], multiple_waterfall_plots: bo
     shap.plots.bar(shap_values, show=False)
     buf = BytesIO()
     plt.tight_layout()
-    plt.savefig(buf, format='png', dpi=100)
+    plt.savefig(buf, format='png', dpi=PLOT_DPI)
     plt.close()
     plots['bar_plot'] = base64.b64encode(buf.getvalue()).decode('utf-8')
     
@@ -167,7 +189,7 @@ def generate_shap_plots(model_data: Dict[str, Any], multiple_waterfall_plots: bo
     shap.plots.beeswarm(shap_values, show=False)
     buf = BytesIO()
     plt.tight_layout()
-    plt.savefig(buf, format='png', dpi=100)
+    plt.savefig(buf, format='png', dpi=PLOT_DPI)
     plt.close()
     plots['beeswarm_plot'] = base64.b64encode(buf.getvalue()).decode('utf-8')
     
@@ -176,14 +198,14 @@ def generate_shap_plots(model_data: Dict[str, Any], multiple_waterfall_plots: bo
     shap.plots.waterfall(shap_values[0], show=False)
     buf = BytesIO()
     plt.tight_layout()
-    plt.savefig(buf, format='png', dpi=100)
+    plt.savefig(buf, format='png', dpi=PLOT_DPI)
     plt.close()
     plots['waterfall_plot'] = base64.b64encode(buf.getvalue()).decode('utf-8')
     
     # 5. Multiple waterfall plots for different examples if requested
     if multiple_waterfall_plots:
-        # Get predictions for all test instances
-        y_pred = model.predict(X_test)
+        # Reuse the test-set predictions made during training
+        y_pred = model_data['y_pred_test']
         
         # Find indices for low, medium, and high predictions
         sorted_indices = np.argsort(y_pred)
@@ -196,31 +218,31 @@ def generate_shap_plots(model_data: Dict[str, Any], multiple_waterfall_plots: bo
         
         # Generate force plot for low sales example
         plt.figure(figsize=(14, 6))
-        plt.title(f"Low Sales Example (Predicted: {y_pred[low_idx]:.2f}, Actual: {y_test.iloc[low_idx]:.2f})")
+        plt.title(f"Low Sales Example (Predicted: {y_pred[low_idx]:.2f}, Actual: {y_test[low_idx]:.2f})")
         shap.plots.force(shap_values[low_idx], matplotlib=True, show=False, figsize=(14, 3))
         buf = BytesIO()
         plt.tight_layout(pad=3.0)
-        plt.savefig(buf, format='png', dpi=120)
+        plt.savefig(buf, format='png', dpi=FORCE_PLOT_DPI)
         plt.close()
         plots['waterfall_plot_low'] = base64.b64encode(buf.getvalue()).decode('utf-8')
         
         # Generate force plot for medium sales example
         plt.figure(figsize=(14, 6))
-        plt.title(f"Medium Sales Example (Predicted: {y_pred[med_idx]:.2f}, Actual: {y_test.iloc[med_idx]:.2f})")
+        plt.title(f"Medium Sales Example (Predicted: {y_pred[med_idx]:.2f}, Actual: {y_test[med_idx]:.2f})")
         shap.plots.force(shap_values[med_idx], matplotlib=True, show=False, figsize=(14, 3))
         buf = BytesIO()
         plt.tight_layout(pad=3.0)
-        plt.savefig(buf, format='png', dpi=120)
+        plt.savefig(buf, format='png', dpi=FORCE_PLOT_DPI)
         plt.close()
         plots['waterfall_plot_medium'] = base64.b64encode(buf.getvalue()).decode('utf-8')
         
         # Generate force plot for high sales example
         plt.figure(figsize=(14, 6))
-        plt.title(f"High Sales Example (Predicted: {y_pred[high_idx]:.2f}, Actual: {y_test.iloc[high_idx]:.2f})")
+        plt.title(f"High Sales Example (Predicted: {y_pred[high_idx]:.2f}, Actual: {y_test[high_idx]:.2f})")
         shap.plots.force(shap_values[high_idx], matplotlib=True, show=False, figsize=(14, 3))
         buf = BytesIO()
         plt.tight_layout(pad=3.0)
-        plt.savefig(buf, format='png', dpi=120)
+        plt.savefig(buf, format='png', dpi=FORCE_PLOT_DPI)
         plt.close()
         plots['waterfall_plot_high'] = base64.b64encode(buf.getvalue()).decode('utf-8')
     
@@ -245,9 +267,10 @@ def get_feature_importance(model_data: Dict[str, Any]):
     importance = model.feature_importances_
     
     # Create a list of dictionaries with feature names and importance scores
+    # (tolist() converts the whole array to Python floats in one C call)
     feature_importance = [
-        {'feature': feature, 'importance': float(score)}
-        for feature, score in zip(feature_names, importance)
+        {'feature': feature, 'importance': score}
+        for feature, score in zip(feature_names, importance.tolist())
     ]
     
     # Sort by importance (descending)
@@ -255,12 +278,12 @@ def get_feature_importance(model_data: Dict[str, Any]):
     
     return feature_importance
 
-def analyze_data(data: List[Dict[str, Any]], date_column: str, target_column: str, multiple_waterfall_plots: bool = False):
+def analyze_data(data: Union[List[Dict[str, Any]], pd.DataFrame], date_column: str, target_column: str, multiple_waterfall_plots: bool = False):
     """
     Analyze data using XGBoost and SHAP.
     
     Args:
-        data: List of dictionaries containing the data
+        data: List of dictionaries or a DataFrame containing the data
         date_column: Name of the date column
         target_column: Name of the target column
         multiple_waterfall_plots: Whether to generate multiple waterfall plots for different examples
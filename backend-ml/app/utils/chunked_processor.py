@@ -14,12 +14,32 @@ import matplotlib.pyplot as plt
 from io import BytesIO
 from typing import Dict, List, Any, Optional, Union, Tuple
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
+from .metrics import regression_metrics
+from .analysis import PLOT_DPI, XGB_DEVICE
 from datetime import datetime
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Default booster parameters for chunked training
+DEFAULT_XGB_PARAMS = {
+    "objective": "reg:squarederror",
+    "tree_method": "hist",  # Memory-efficient histogram method
+    "device": XGB_DEVICE,
+    "max_depth": 6,
+    "learning_rate": 0.1,
+    "subsample": 0.8,  # Use subset of data for each tree
+    "colsample_bytree": 0.8,  # Use subset of features for each tree
+    "random_state": 42,
+    "nthread": 1  # Force single thread for GCP Cloud Run
+}
+
+def _finite_metrics(**metrics: float) -> Dict[str, float]:
+    """Convert metric values to floats in one vectorized pass, replacing NaN/inf with 0.0."""
+    values = np.nan_to_num(np.fromiter(metrics.values(), dtype=np.float64, count=len(metrics)),
+                           nan=0.0, posinf=0.0, neginf=0.0)
+    return dict(zip(metrics.keys(), values.tolist()))
+
 class ChunkedXGBoostProcessor:
     """
     Memory-efficient XGBoost training using chunked data processing.
@@ -39,20 +59,13 @@ class ChunkedXGBoostProcessor:
             xgb_params: XGBoost parameters
         """
         self.max_memory_mb = max_memory_mb
-        self.xgb_params = xgb_params or {
-            "objective": "reg:squarederror",
-            "tree_method": "hist",  # Memory-efficient histogram method
-            "max_depth": 6,
-            "learning_rate": 0.1,
-            "subsample": 0.8,  # Use subset of data for each tree
-            "colsample_bytree": 0.8,  # Use subset of features for each tree
-            "random_state": 42,
-            "nthread": 1  # Force single thread for GCP Cloud Run
-        }
+        self.xgb_params = xgb_params or dict(DEFAULT_XGB_PARAMS)
         self.model = None
         self.feature_names = None
         self.metrics = {}
         self.test_data = None
+        # Whether each date column parses as datetime, decided once and reused for every chunk
+        self._date_parseable: Dict[str, bool] = {}
         
     async def process_parquet_bytes(
         self,
@@ -84,9 +97,8 @@ class ChunkedXGBoostProcessor:
         con.execute("INSTALL parquet")
         con.execute("LOAD parquet")
         
-        # Get schema to identify columns
-        table = pq.read_table(buffer, memory_map=True)
-        all_columns = table.column_names
+        # Get schema from the footer to identify columns without decoding any data
+        all_columns = pq.read_schema(buffer).names
         
         # Create a list of columns to exclude, adding the date column to avoid one-hot encoding it
         exclude_columns_list = list(exclude_columns or [])
@@ -106,12 +118,16 @@ class ChunkedXGBoostProcessor:
         logger.info(f"All columns: {all_columns}")
         logger.info(f"Date column: {date_column}, Target column: {target_column}")
         
+        # Decode the parquet once, only the columns we use; every later step reuses this table
+        buffer.seek(0)
+        table = pq.read_table(buffer, columns=columns_to_include)
+        
         # Count total rows
-        total_rows = await self._count_rows(con, buffer)
+        total_rows = table.num_rows
         logger.info(f"Total rows in dataset: {total_rows}")
         
         # Calculate rows per chunk based on memory limit
-        rows_per_25mb = await self._estimate_rows_per_memory(buffer, 25)
+        rows_per_25mb = await self._estimate_rows_per_memory(table, 25)
         logger.info(f"Estimated rows per 25MB: {rows_per_25mb}")
         
         # Determine if we need chunking
@@ -119,23 +135,19 @@ class ChunkedXGBoostProcessor:
             # Process all data at once (similar to analyze_from_redis)
             logger.info("Dataset fits in memory, processing all at once")
             return await self._process_all_data(
-                con, buffer, columns_to_include, date_column, target_column, test_size
+                con, table, columns_to_include, date_column, target_column, test_size
             )
         else:
             # Process in chunks
             logger.info("Dataset too large, processing in chunks")
             return await self._process_in_chunks(
-                con, buffer, columns_to_include, date_column, target_column, 
+                con, table, columns_to_include, date_column, target_column, 
                 test_size, rows_per_25mb, total_rows
             )
     
-    async def _estimate_rows_per_memory(self, buffer: io.BytesIO, target_mb: int) -> int:
+    async def _estimate_rows_per_memory(self, table: pa.Table, target_mb: int) -> int:
         """Estimate how many rows equals the target memory size."""
         try:
-            # Read a sample of 1000 rows
-            buffer.seek(0)
-            # PyArrow doesn't support num_rows parameter, so we'll read the first few rows differently
-            table = pq.read_table(buffer)
             # Convert a small portion to pandas to estimate size
             sample_size = min(1000, table.num_rows)
             sample_df = table.slice(0, sample_size).to_pandas()
@@ -152,20 +164,10 @@ class ChunkedXGBoostProcessor:
             logger.warning(f"Error estimating rows per memory: {str(e)}")
             return 10000  # Default value
     
-    async def _count_rows(self, con, buffer) -> int:
-        """Count total rows in parquet file."""
-        try:
-            buffer.seek(0)
-            table = pq.read_table(buffer)
-            return table.num_rows
-        except Exception as e:
-            logger.warning(f"Could not count rows: {str(e)}. Estimating 1,000,000 rows.")
-            return 1000000
-    
     async def _process_all_data(
         self, 
         con, 
-        buffer, 
+        table: pa.Table, 
         columns_to_include: List[str],
         date_column: str, 
         target_column: str,
@@ -173,8 +175,7 @@ class ChunkedXGBoostProcessor:
     ) -> Dict[str, Any]:
         """Process all data at once similar to analyze_from_redis."""
         # Load all data
-        buffer.seek(0)
-        con.register("data_view", pq.read_table(buffer))
+        con.register("data_view", table)
         
         # Build SQL column list
         columns_sql = ", ".join([f'"{col}"' for col in columns_to_include])
@@ -215,20 +216,13 @@ class ChunkedXGBoostProcessor:
         y_pred = self.model.predict(dtest)
         
         # Calculate metrics
-        test_rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-        test_r2 = r2_score(y_test, y_pred)
+        test_rmse, test_r2 = regression_metrics(y_test, y_pred)
         
         # Calculate training metrics
         dtrain_pred = self.model.predict(dtrain)
-        train_rmse = np.sqrt(mean_squared_error(y_train, dtrain_pred))
-        train_r2 = r2_score(y_train, dtrain_pred)
-        
-        self.metrics = {
-            'test_rmse': float(test_rmse) if not np.isinf(test_rmse) and not np.isnan(test_rmse) else 0.0,
-            'test_r2': float(test_r2) if not np.isinf(test_r2) and not np.isnan(test_r2) else 0.0,
-            'train_rmse': float(train_rmse) if not np.isinf(train_rmse) and not np.isnan(train_rmse) else 0.0,
-            'train_r2': float(train_r2) if not np.isinf(train_r2) and not np.isnan(train_r2) else 0.0
-        }
+        train_rmse, train_r2 = regression_metrics(y_train, dtrain_pred)
+        
+        self.metrics = _finite_metrics(test_rmse=test_rmse, test_r2=test_r2, train_rmse=train_rmse, train_r2=train_r2)
         
         # Generate SHAP analysis
         shap_plots = self._generate_shap_plots(X_test, self.feature_names)
@@ -249,7 +243,7 @@ class ChunkedXGBoostProcessor:
     async def _process_in_chunks(
         self,
         con, 
-        buffer, 
+        table: pa.Table, 
         columns_to_include: List[str],
         date_column: str, 
         target_column: str,
@@ -258,8 +252,7 @@ class ChunkedXGBoostProcessor:
         total_rows: int
     ) -> Dict[str, Any]:
         """Process data in chunks for memory efficiency."""
-        buffer.seek(0)
-        con.register("data_view", pq.read_table(buffer))
+        con.register("data_view", table)
         
         # Build SQL column list
         columns_sql = ", ".join([f'"{col}"' for col in columns_to_include])
@@ -367,14 +360,12 @@ class ChunkedXGBoostProcessor:
             all_train_X.append(X_chunk.copy())
             all_train_y.append(y_chunk.copy())
             
-            # Continue training
+            # Continue training in place on the same Booster; xgb.train(xgb_model=...)
+            # would serialize and reload the whole model for every chunk
             dtrain = xgb.DMatrix(X_chunk, label=y_chunk)
-            self.model = xgb.train(
-                self.xgb_params, 
-                dtrain, 
-                num_boost_round=100 // num_chunks,
-                xgb_model=self.model
-            )
+            start_round = self.model.num_boosted_rounds()
+            for boost_round in range(start_round, start_round + 100 // num_chunks):
+                self.model.update(dtrain, boost_round)
             
             chunks_processed += 1
             logger.info(f"Processed chunk {chunk_idx+1}/{num_chunks}")
@@ -415,8 +406,7 @@ class ChunkedXGBoostProcessor:
             # Calculate training metrics on the sample
             dtrain_sample = xgb.DMatrix(train_X_sample, label=train_y_sample)
             train_pred = self.model.predict(dtrain_sample)
-            train_rmse = np.sqrt(mean_squared_error(train_y_sample, train_pred))
-            train_r2 = r2_score(train_y_sample, train_pred)
+            train_rmse, train_r2 = regression_metrics(train_y_sample, train_pred)
         else:
             # If we can't calculate training metrics, use zeros
             train_rmse = 0.0
@@ -441,16 +431,10 @@ class ChunkedXGBoostProcessor:
         y_pred = self.model.predict(dtest)
         
         # Calculate metrics
-        test_rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-        test_r2 = r2_score(y_test, y_pred)
-        
-        self.metrics = {
-            'test_rmse': float(test_rmse) if not np.isinf(test_rmse) and not np.isnan(test_rmse) else 0.0,
-            'test_r2': float(test_r2) if not np.isinf(test_r2) and not np.isnan(test_r2) else 0.0,
-            'train_rmse': float(train_rmse) if not np.isinf(train_rmse) and not np.isnan(train_rmse) else 0.0,
-            'train_r2': float(train_r2) if not np.isinf(train_r2) and not np.isnan(train_r2) else 0.0,
-            'chunks_processed': chunks_processed
-        }
+        test_rmse, test_r2 = regression_metrics(y_test, y_pred)
+        
+        self.metrics = _finite_metrics(test_rmse=test_rmse, test_r2=test_r2, train_rmse=train_rmse, train_r2=train_r2)
+        self.metrics['chunks_processed'] = chunks_processed
         
         # Generate SHAP plots
         shap_plots = self._generate_shap_plots(X_test, self.feature_names)
@@ -477,18 +461,23 @@ class ChunkedXGBoostProcessor:
     def _extract_date_features(self, df: pd.DataFrame, date_column: str) -> pd.DataFrame:
         """Extract useful features from the date column."""
         try:
-            # Make a copy to avoid modifying the original
-            df = df.copy()
-            
             # Try to convert to datetime
             if date_column in df.columns:
-                # Check if the column is already a datetime type
-                if not pd.api.types.is_datetime64_any_dtype(df[date_column]):
-                    try:
-                        df[date_column] = pd.to_datetime(df[date_column])
-                    except Exception as e:
-                        logger.warning(f"Could not convert {date_column} to datetime: {str(e)}")
-                        return df
+                # Parse only on the first chunk, keeping the converted column;
+                # later chunks reuse the decision
+                if date_column not in self._date_parseable:
+                    parseable = True
+                    # Check if the column is already a datetime type
+                    if not pd.api.types.is_datetime64_any_dtype(df[date_column]):
+                        try:
+                            df = df.assign(**{date_column: pd.to_datetime(df[date_column])})
+                        except Exception as e:
+                            logger.warning(f"Could not convert {date_column} to datetime: {str(e)}")
+                            parseable = False
+                    self._date_parseable[date_column] = parseable
+                
+                if not self._date_parseable[date_column]:
+                    return df
                 
                 # Extract useful features from the date
                 # df[f'{date_column}_year'] = df[date_column].dt.year
@@ -553,7 +542,7 @@ class ChunkedXGBoostProcessor:
         """Generate SHAP plots for the model."""
         try:
             # Create an explainer 
-            explainer = shap.Explainer(self.model)
+            explainer = shap.TreeExplainer(self.model)
             
             # Take a small representative sample of the test data to avoid potential issues
             sample_size = min(100, len(X_test))
@@ -628,7 +617,7 @@ class ChunkedXGBoostProcessor:
     def _get_plot_as_base64(self) -> str:
         """Convert the current matplotlib plot to a base64 string."""
         buffer = BytesIO()
-        plt.savefig(buffer, format="png", bbox_inches="tight", dpi=100)
+        plt.savefig(buffer, format="png", bbox_inches="tight", dpi=PLOT_DPI)
         plt.close()
         buffer.seek(0)
         img_str = base64.b64encode(buffer.read()).decode("utf-8")
@@ -14,20 +14,34 @@ logger = logging.getLogger(__name__)
 DUCKDB_MEMORY_LIMIT = "50%"  # Default memory limit is 50% of system memory
 DUCKDB_TEMP_DIR = None  # Use default temporary directory
 
+def _is_numeric_arrow_type(arrow_type: pa.DataType) -> bool:
+    """Whether an Arrow type loads as a numeric or boolean pandas column."""
+    return (
+        pa.types.is_integer(arrow_type)
+        or pa.types.is_floating(arrow_type)
+        or pa.types.is_decimal(arrow_type)
+        or pa.types.is_boolean(arrow_type)
+    )
+
 async def process_parquet_for_ml(
     parquet_data: bytes,
     date_column: str,
     target_column: str,
-    exclude_columns: Optional[List[str]] = None
+    exclude_columns: Optional[List[str]] = None,
+    numeric_only: bool = False
 ) -> pd.DataFrame:
     """
     Process Parquet data using DuckDB, selecting only the relevant columns for ML.
     
+    Column selection is resolved from the Parquet schema and pushed into the read,
+    so excluded (and, with numeric_only, non-numeric) columns are never decoded.
+    
     Args:
         parquet_data: Parquet data as bytes
         date_column: Name of the date column (will be included but can be used for filtering)
         target_column: Name of the target column for ML prediction
         exclude_columns: Additional columns to exclude
+        numeric_only: Keep only numeric and boolean columns (plus date and target)
         
     Returns:
         Pandas DataFrame with selected columns
@@ -36,9 +50,9 @@ async def process_parquet_for_ml(
         # Create a buffer from the content
         buffer = io.BytesIO(parquet_data)
         
-        # Read as a PyArrow table for column inspection
-        table = pq.read_table(buffer)
-        all_columns = table.column_names
+        # Read only the schema for column inspection
+        schema = pq.read_schema(buffer)
+        all_columns = schema.names
         logger.info(f"Parquet file has {len(all_columns)} columns: {all_columns}")
         
         # Determine which columns to use for ML
@@ -55,10 +69,20 @@ async def process_parquet_for_ml(
         if exclude_columns:
             columns_to_exclude.update(exclude_columns)
         
+        # Restrict to numeric and boolean columns if requested
+        if numeric_only:
+            columns_to_exclude.update(
+                field.name for field in schema if not _is_numeric_arrow_type(field.type)
+            )
+        
         # Create the list of columns to select
         columns_to_select = [col for col in all_columns if col not in columns_to_exclude or col in [date_column, target_column]]
         logger.info(f"Selected {len(columns_to_select)} columns for ML out of {len(all_columns)}")
         
+        # Decode only the selected columns
+        buffer.seek(0)
+        table = pq.read_table(buffer, columns=columns_to_select)
+        
         # Create DuckDB connection
         con = duckdb.connect(":memory:")
         
@@ -130,35 +154,6 @@ def process_parquet_pandas(parquet_data: bytes,
     
     return df
 
-async def filter_data_by_column_types(df: pd.DataFrame, date_column: str, target_column: str) -> pd.DataFrame:
-    """
-    Filter DataFrame to include only numeric and boolean columns (plus date and target).
-    
-    Args:
-        df: DataFrame to filter
-        date_column: Name of the date column (always included)
-        target_column: Name of the target column (always included)
-        
-    Returns:
-        Filtered DataFrame
-    """
-    # Get numeric and boolean columns
-    numeric_cols = df.select_dtypes(include=['number', 'bool']).columns.tolist()
-    
-    # Always include date and target columns
-    columns_to_keep = list(set(numeric_cols + [date_column, target_column]))
-    
-    # Log what we're keeping and dropping
-    all_columns = df.columns.tolist()
-    dropped_columns = [col for col in all_columns if col not in columns_to_keep]
-    
-    logger.info(f"Keeping {len(columns_to_keep)} columns: {columns_to_keep}")
-    if dropped_columns:
-        logger.info(f"Dropping {len(dropped_columns)} non-numeric columns: {dropped_columns}")
-    
-    # Return filtered DataFrame
-    return df[columns_to_keep]
-
 async def compute_column_statistics(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
     """
     Compute column statistics for a DataFrame.
@@ -171,11 +166,15 @@ async def compute_column_statistics(df: pd.DataFrame) -> Dict[str, Dict[str, Any
     """
     stats = {}
     
+    # Non-null counts for all columns in one pass; nulls follow from the row count
+    non_null_counts = df.count()
+    
     for col in df.columns:
+        count = int(non_null_counts[col])
         col_stats = {
             "dtype": str(df[col].dtype),
-            "count": int(df[col].count()),
-            "null_count": int(df[col].isna().sum()),
+            "count": count,
+            "null_count": len(df) - count,
             "unique_count": int(df[col].nunique())
         }
         
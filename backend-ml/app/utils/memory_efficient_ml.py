@@ -13,7 +13,7 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 
 # Import our processing modules
-from app.utils.chunked_processor import ChunkedXGBoostProcessor
+from app.utils.chunked_processor import ChunkedXGBoostProcessor, DEFAULT_XGB_PARAMS
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -50,16 +50,7 @@ class MemoryEfficientML:
         }
         
         # XGBoost parameters - optimized for efficiency while maintaining reasonable accuracy
-        self.xgb_params = {
-            "objective": "reg:squarederror",
-            "tree_method": "hist",  # Memory-efficient histogram method
-            "max_depth": 6,
-            "learning_rate": 0.1,
-            "subsample": 0.8,  # Use subset of data for each tree
-            "colsample_bytree": 0.8,  # Use subset of features for each tree
-            "random_state": 42,
-            "nthread": 1  # Force single thread for GCP Cloud Run
-        }
+        self.xgb_params = dict(DEFAULT_XGB_PARAMS)
     
     def _determine_processor_type(self, data_size: int) -> str:
         """
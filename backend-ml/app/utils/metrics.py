@@ -0,0 +1,33 @@
+import numpy as np
+from typing import Tuple
+
+def regression_metrics(y_true, y_pred) -> Tuple[float, float]:
+    """
+    Compute RMSE and R² from a single residual pass.
+
+    Equivalent to sqrt(mean_squared_error) and r2_score from sklearn, which
+    each validate and re-scan both arrays separately.
+
+    Args:
+        y_true: Ground-truth target values
+        y_pred: Predicted values
+
+    Returns:
+        Tuple of (rmse, r2)
+    """
+    y_true = np.asarray(y_true, dtype=np.float64).ravel()
+    y_pred = np.asarray(y_pred, dtype=np.float64).ravel()
+
+    residuals = y_true - y_pred
+    sse = float(np.dot(residuals, residuals))
+    centered = y_true - y_true.mean()
+    sst = float(np.dot(centered, centered))
+
+    rmse = float(np.sqrt(sse / len(y_true)))
+    if sst == 0.0:
+        # Constant target: match sklearn's finite convention
+        r2 = 1.0 if sse == 0.0 else 0.0
+    else:
+        r2 = 1.0 - sse / sst
+
+    return rmse, r2
@@ -1,10 +1,12 @@
 import os
 import json
+import asyncio
 import base64
 import io
 import logging
 from typing import Dict, Any, Optional, Union, List
 from dotenv import load_dotenv
+from orjson import loads as json_loads
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -20,6 +22,8 @@ logger.info(f"Redis URL configured: {REDIS_URL is not None}")
 logger.info(f"Redis Token configured: {REDIS_TOKEN is not None}")
 
 # Initialize Redis client
+# The Upstash SDK client is synchronous, so async helpers below run each command
+# via asyncio.to_thread to avoid blocking the event loop on network round trips.
 redis_client = None
 
 def get_redis_client():
@@ -124,12 +128,12 @@ async def retrieve_parquet_data(dataset_id: str) -> Optional[bytes]:
         
         # Step 1: Get metadata
         meta_key = f"{dataset_id}:meta"
-        metadata_json = client.get(meta_key)
+        metadata_json = await asyncio.to_thread(client.get, meta_key)
         
         if not metadata_json:
             logger.warning(f"No metadata found for dataset ID: {dataset_id}")
             # Try direct retrieval as fallback
-            direct_data = client.get(dataset_id)
+            direct_data = await asyncio.to_thread(client.get, dataset_id)
             if direct_data:
                 logger.info(f"Retrieved {len(direct_data)} bytes directly for dataset {dataset_id}")
                 return direct_data if isinstance(direct_data, bytes) else direct_data.encode('utf-8')
@@ -137,7 +141,7 @@ async def retrieve_parquet_data(dataset_id: str) -> Optional[bytes]:
         
         # Parse metadata
         try:
-            metadata = json.loads(metadata_json)
+            metadata = json_loads(metadata_json)
             logger.info(f"Retrieved metadata for dataset {dataset_id}")
         except json.JSONDecodeError:
             logger.error(f"Invalid JSON in metadata for dataset {dataset_id}")
@@ -157,7 +161,7 @@ async def retrieve_parquet_data(dataset_id: str) -> Optional[bytes]:
                 chunk_parts = metadata.get(f"chunk_{i}_parts", 0)
                 for j in range(chunk_parts):
                     sub_key = f"{dataset_id}:chunk:{i}:{j}"
-                    sub_encoded = client.get(sub_key)
+                    sub_encoded = await asyncio.to_thread(client.get, sub_key)
                     
                     if not sub_encoded:
                         logger.warning(f"Sub-chunk {i}:{j} not found for dataset {dataset_id}")
@@ -169,7 +173,7 @@ async def retrieve_parquet_data(dataset_id: str) -> Optional[bytes]:
             else:
                 # Regular chunk
                 chunk_key = f"{dataset_id}:chunk:{i}"
-                encoded_chunk = client.get(chunk_key)
+                encoded_chunk = await asyncio.to_thread(client.get, chunk_key)
                 
                 if not encoded_chunk:
                     logger.warning(f"Chunk {i} not found for dataset {dataset_id}")
@@ -211,7 +215,7 @@ async def store_parquet_data(dataset_id: str, parquet_data: bytes,
         logger.info(f"Storing dataset {dataset_id} in Redis ({len(parquet_data)} bytes, " 
                    f"expiration: {expiration_seconds} seconds)")
         
-        client.set(dataset_id, parquet_data, ex=expiration_seconds)
+        await asyncio.to_thread(client.set, dataset_id, parquet_data, ex=expiration_seconds)
         logger.info(f"Dataset {dataset_id} stored successfully")
         return True
         
@@ -238,20 +242,20 @@ async def delete_dataset(dataset_id: str) -> bool:
         logger.info(f"Deleting dataset: {dataset_id}")
         
         # First try to delete the direct key
-        result = client.delete(dataset_id)
+        result = await asyncio.to_thread(client.delete, dataset_id)
         if result == 1:
             logger.info(f"Deleted dataset {dataset_id} directly")
             return True
         
         # If not found, try the chunked version
         meta_key = f"{dataset_id}:meta"
-        metadata_json = client.get(meta_key)
+        metadata_json = await asyncio.to_thread(client.get, meta_key)
         
         deleted_keys = 0
         
         if metadata_json:
             try:
-                metadata = json.loads(metadata_json)
+                metadata = json_loads(metadata_json)
                 total_chunks = metadata.get("total_chunks", 1)
                 
                 # Delete each chunk
@@ -261,15 +265,15 @@ async def delete_dataset(dataset_id: str) -> bool:
                         chunk_parts = metadata.get(f"chunk_{i}_parts", 0)
                         for j in range(chunk_parts):
                             sub_key = f"{dataset_id}:chunk:{i}:{j}"
-                            result = client.delete(sub_key)
+                            result = await asyncio.to_thread(client.delete, sub_key)
                             deleted_keys += result
                     else:
                         chunk_key = f"{dataset_id}:chunk:{i}"
-                        result = client.delete(chunk_key)
+                        result = await asyncio.to_thread(client.delete, chunk_key)
                         deleted_keys += result
                 
                 # Delete metadata
-                result = client.delete(meta_key)
+                result = await asyncio.to_thread(client.delete, meta_key)
                 deleted_keys += result
                 
                 logger.info(f"Deleted {deleted_keys} keys for dataset {dataset_id}")
@@ -280,7 +284,7 @@ async def delete_dataset(dataset_id: str) -> bool:
                 logger.error(f"Invalid JSON in metadata for dataset {dataset_id}")
                 
                 # Try to delete metadata anyway
-                client.delete(meta_key)
+                await asyncio.to_thread(client.delete, meta_key)
                 return False
         else:
             logger.warning(f"No metadata or direct key found for dataset ID: {dataset_id}")
@@ -304,11 +308,11 @@ async def get_keys_info() -> Dict[str, Any]:
     
     try:
         # Get all keys and their sizes
-        keys = client.keys("*")
+        keys = await asyncio.to_thread(client.keys, "*")
         key_count = len(keys)
         
         # Get memory info
-        memory_info = client.info("memory")
+        memory_info = await asyncio.to_thread(client.info, "memory")
         used_memory = int(memory_info.get("used_memory", 0))
         used_memory_human = memory_info.get("used_memory_human", "unknown")
         
@@ -35,8 +35,8 @@ def create_representative_sample(input_file, output_file, sample_size=1000):
         rare_categories = value_counts[value_counts < 10].index
         
         if len(rare_categories) > 0:
-            df[strat_column + '_grouped'] = df[strat_column].apply(
-                lambda x: 'RARE_CATEGORY' if x in rare_categories else x
+            df[strat_column + '_grouped'] = df[strat_column].mask(
+                df[strat_column].isin(rare_categories), 'RARE_CATEGORY'
             )
             strat_column = strat_column + '_grouped'
         
@@ -83,37 +83,33 @@ def random_sampling_with_numeric_representation(df, sample_size):
     
     if len(numeric_cols) > 0:
         # Try using k-means to create representative clusters
-        from sklearn.cluster import KMeans
+        from sklearn.cluster import MiniBatchKMeans
         from sklearn.preprocessing import StandardScaler
         
         # Select numeric columns for clustering
-        X = df[numeric_cols].fillna(df[numeric_cols].mean())
+        numeric = df[numeric_cols]
+        X = numeric.fillna(numeric.mean()).to_numpy(dtype=np.float64)
         
-        # Standardize the data
-        scaler = StandardScaler()
+        # Standardize the data in place; X is already a private array
+        scaler = StandardScaler(copy=False)
         X_scaled = scaler.fit_transform(X)
         
         # Determine number of clusters (sqrt of sample size is a common heuristic)
         n_clusters = min(int(np.sqrt(sample_size)), len(df) // 5)
         n_clusters = max(n_clusters, 2)  # At least 2 clusters
         
-        # Apply k-means clustering
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+        # Apply mini-batch k-means clustering; the clusters only guide
+        # sampling, so approximate centroids are good enough
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=4096, n_init=3, random_state=42)
         df['cluster'] = kmeans.fit_predict(X_scaled)
         
-        # Sample from each cluster proportionally
-        sampled_rows = []
-        for cluster_id in range(n_clusters):
-            cluster_df = df[df['cluster'] == cluster_id]
-            cluster_prop = len(cluster_df) / len(df)
-            cluster_samples = max(1, int(sample_size * cluster_prop))
-            if len(cluster_df) > cluster_samples:
-                sampled_rows.append(cluster_df.sample(cluster_samples, random_state=42))
-            else:
-                sampled_rows.append(cluster_df)
-        
-        # Combine all sampled clusters
-        df_sample = pd.concat(sampled_rows)
+        # Sample from each cluster proportionally: shuffle once, then keep the
+        # first max(1, proportional share) rows of every cluster
+        cluster_sizes = df['cluster'].value_counts()
+        cluster_samples = np.maximum(1, (sample_size * cluster_sizes / len(df)).astype(int))
+        shuffled = df.sample(frac=1, random_state=42)
+        position = shuffled.groupby('cluster').cumcount()
+        df_sample = shuffled[position < shuffled['cluster'].map(cluster_samples)]
         
         # If we got too many samples, randomly drop some
         if len(df_sample) > sample_size:
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from timeseries import _freq_seasonal_period, _seasonal_period, _two_stage_pelt
+
+
+@pytest.mark.parametrize("freq, expected", [
+    ("D", 7),
+    ("B", 5),
+    ("h", 24),
+    ("2h", 12),
+    ("15min", 96),
+    ("W-SUN", 52),
+    ("MS", 12),
+    ("ME", 12),
+    ("BME", 12),
+    ("BMS", 12),
+    ("QE-DEC", 4),
+    ("BQE-DEC", 4),
+    ("3ME", 4),
+])
+def test_freq_seasonal_period_known_aliases(freq, expected):
+    assert _freq_seasonal_period(freq) == expected
+
+
+@pytest.mark.parametrize("freq", ["ms", "s", "us", "YE-DEC", "YS-JAN", "2D", "7D", "not-a-freq"])
+def test_freq_seasonal_period_unrecognised_aliases(freq):
+    assert _freq_seasonal_period(freq) is None
+
+
+def test_seasonal_period_from_dates():
+    assert _seasonal_period(pd.date_range("2020-01-01", periods=40, freq="D")) == 7
+    assert _seasonal_period(pd.date_range("2020-01-01", periods=40, freq="BME")) == 12
+    assert _seasonal_period(pd.to_datetime(["2020-01-01", "2020-01-02", "2020-01-05"])) is None
+
+
+def _spike_and_shift_series(n):
+    """Standardized noise with a 20-point spike at 400-420 and a level shift at 600."""
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=n)
+    x[400:420] += 6
+    x[600:] += 3
+    return (x - x.mean()) / x.std()
+
+
+def test_two_stage_pelt_matches_full_pelt_on_short_segment():
+    from ruptures import Pelt
+    
+    signal = _spike_and_shift_series(900)
+    full = Pelt(model="rbf").fit(signal).predict(pen=10)
+    assert full == [400, 420, 600, 900]
+    assert _two_stage_pelt(signal, pen=10, min_points=0) == full
+
+
+def test_two_stage_pelt_uses_full_pelt_below_threshold():
+    from ruptures import Pelt
+    
+    signal = _spike_and_shift_series(900)
+    assert _two_stage_pelt(signal, pen=10) == Pelt(model="rbf").fit(signal).predict(pen=10)
@@ -6,7 +6,6 @@ from sklearn.ensemble import IsolationForest
 from statsmodels.tsa.seasonal import STL
 import xgboost as xgb
 import shap
-from causalimpact import CausalImpact
 
 
 def load_csv():
@@ -60,7 +59,7 @@ def detect_anomalies(df, date_col, sales_col):
     """Performs anomaly detection using Isolation Forest and STL decomposition."""
     try:
         # Isolation Forest
-        iso_forest = IsolationForest(contamination=0.05, random_state=42)
+        iso_forest = IsolationForest(contamination=0.05, random_state=42, n_jobs=-1)
         df['anomaly'] = iso_forest.fit_predict(df[[sales_col]])
 
         # STL Decomposition
@@ -116,6 +115,9 @@ def feature_importance_analysis(df, sales_col, date_col):
 def run_causal_impact(df, sales_col, date_col):
     """Applies CausalImpact to assess how an event affected sales."""
     try:
+        # Imported here: causalimpact is slow to import and only needed by this step
+        from causalimpact import CausalImpact
+        
         # Ask user for event date
         print("\nEnter the date when an event occurred (format: YYYY-MM-DD)")
         event_date = input().strip()
@@ -1,3 +1,5 @@
+import argparse
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -10,8 +12,6 @@ from statsmodels.tsa.holtwinters import ExponentialSmoothing
 from statsmodels.tsa.arima.model import ARIMA
 import xgboost as xgb
 import shap
-from causalimpact import CausalImpact
-from prophet import Prophet
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -19,10 +19,53 @@ import warnings
 warnings.filterwarnings('ignore')
 
 
-def load_csv():
-    """Loads a CSV file with error handling."""
+# Upper bound on points drawn per line; longer series are decimated before plotting
+MAX_PLOT_POINTS = 5000
+
+
+def _decimate(x, y, max_points=MAX_PLOT_POINTS):
+    """Downsample (x, y) for plotting, keeping the min and max of each bucket so peaks survive."""
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= max_points:
+        return x, y
+    
+    n_buckets = max(max_points // 2, 1)
+    bucket = -(-n // n_buckets)  # ceil division
+    padded = np.full(n_buckets * bucket, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_buckets, bucket)
+    
+    offsets = np.arange(n_buckets) * bucket
+    lo = offsets + np.argmin(np.where(np.isnan(blocks), np.inf, blocks), axis=1)
+    hi = offsets + np.argmax(np.where(np.isnan(blocks), -np.inf, blocks), axis=1)
+    idx = np.unique(np.concatenate([lo, hi]))
+    idx = idx[idx < n]
+    return x[idx], y[idx]
+
+
+def _decimated_xy(x, y, max_points=MAX_PLOT_POINTS):
+    """Keyword form of _decimate for plotly trace constructors."""
+    x, y = _decimate(x, y, max_points)
+    return {'x': x, 'y': y}
+
+
+def _confirm(prompt, answer=None, default=False):
+    """Resolves a y/n option: an explicit answer wins, otherwise ask when stdin is interactive."""
+    if answer is not None:
+        return answer
+    if not sys.stdin.isatty():
+        return default
+    return input(prompt).strip().lower() == 'y'
+
+
+def load_csv(file_path=None):
+    """Loads a CSV file with error handling, prompting for the path unless one is given."""
+    prompt = file_path is None
     while True:
-        file_path = input("Enter the path to your sales CSV file: ").strip()
+        if prompt:
+            file_path = input("Enter the path to your sales CSV file: ").strip()
         try:
             df = pd.read_csv(file_path, parse_dates=True, encoding='unicode_escape')
             print("File loaded successfully!")
@@ -33,15 +76,25 @@ def load_csv():
             print("Error: The file is empty.")
         except pd.errors.ParserError:
             print("Error: File could not be parsed. Ensure it is a valid CSV.")
+        
+        # A bad path given on the command line falls back to prompting only when interactive
+        if not sys.stdin.isatty():
+            sys.exit(1)
+        prompt = True
 
 
-def select_columns(df):
-    """Allows the user to select the date and sales column, with auto-detection for sales."""
+def select_columns(df, date_col=None, sales_col=None):
+    """
+    Allows the user to select the date and sales column, with auto-detection for sales.
+    
+    Columns given as arguments are used directly when valid; otherwise the user is prompted.
+    """
     print("\nColumns in dataset:", df.columns.tolist())
 
     # Select date column
     while True:
-        date_col = input("Enter the date column name: ").strip()
+        if date_col is None:
+            date_col = input("Enter the date column name: ").strip()
         if date_col in df.columns:
             try:
                 df[date_col] = pd.to_datetime(df[date_col])
@@ -50,6 +103,14 @@ def select_columns(df):
                 print(f"Error converting {date_col} to datetime: {e}")
         else:
             print("Error: Column not found. Please enter a valid column name.")
+        if not sys.stdin.isatty():
+            sys.exit(1)
+        date_col = None
+
+    if sales_col is not None:
+        if sales_col in df.columns and np.issubdtype(df[sales_col].dtype, np.number):
+            return df, date_col, sales_col
+        print(f"Error: Sales column '{sales_col}' not found or not numeric; auto-detecting instead.")
 
     # Auto-detect sales column (highest variance numerical column)
     num_cols = df.select_dtypes(include=[np.number]).columns.tolist()
@@ -59,14 +120,16 @@ def select_columns(df):
     if num_cols:
         sales_col = max(num_cols, key=lambda col: df[col].var())
         print(f"Auto-detected sales column: {sales_col}")
-        confirm = input(f"Use {sales_col} as the sales/target column? (y/n): ").lower()
-        if confirm != 'y':
+        if not _confirm(f"Use {sales_col} as the sales/target column? (y/n): ", default=True):
             while True:
                 sales_col = input("Enter the sales column name: ").strip()
                 if sales_col in df.columns and np.issubdtype(df[sales_col].dtype, np.number):
                     break
                 print("Error: Column not found or not numeric. Please enter a valid sales column.")
     else:
+        if not sys.stdin.isatty():
+            print("Error: No numeric column to use as the sales column.")
+            sys.exit(1)
         while True:
             sales_col = input("Enter the sales column name: ").strip()
             if sales_col in df.columns and np.issubdtype(df[sales_col].dtype, np.number):
@@ -85,9 +148,9 @@ def perform_basic_eda(df, date_col, sales_col):
     print(df[sales_col].describe())
     
     # Check for missing values
-    missing_values = df.isnull().sum()
+    missing_values = len(df) - df.count()
     print("\nMissing Values:")
-    print(missing_values[missing_values > 0] if any(missing_values > 0) else "No missing values found")
+    print(missing_values[missing_values > 0] if (missing_values > 0).any() else "No missing values found")
     
     # Check data frequency
     if len(df) > 1:
@@ -111,7 +174,7 @@ def perform_basic_eda(df, date_col, sales_col):
     
     # Plot time series
     plt.figure(figsize=(12, 6))
-    plt.plot(df[date_col], df[sales_col])
+    plt.plot(*_decimate(df[date_col], df[sales_col]))
     plt.title(f'{sales_col} Over Time')
     plt.xlabel('Date')
     plt.ylabel(sales_col)
@@ -135,42 +198,125 @@ def perform_basic_eda(df, date_col, sales_col):
 
 def add_time_features(df, date_col):
     """Add time-based features to the dataset."""
-    df['year'] = df[date_col].dt.year
-    df['month'] = df[date_col].dt.month
-    df['day_of_month'] = df[date_col].dt.day
-    df['day_of_week'] = df[date_col].dt.dayofweek
-    df['day_of_year'] = df[date_col].dt.dayofyear
-    df['week_of_year'] = df[date_col].dt.isocalendar().week
-    df['quarter'] = df[date_col].dt.quarter
-    df['is_weekend'] = df['day_of_week'].apply(lambda x: 1 if x >= 5 else 0)
-    df['is_month_start'] = df[date_col].dt.is_month_start.astype(int)
-    df['is_month_end'] = df[date_col].dt.is_month_end.astype(int)
-    df['is_quarter_start'] = df[date_col].dt.is_quarter_start.astype(int)
-    df['is_quarter_end'] = df[date_col].dt.is_quarter_end.astype(int)
-    df['is_year_start'] = df[date_col].dt.is_year_start.astype(int)
-    df['is_year_end'] = df[date_col].dt.is_year_end.astype(int)
+    dates = df[date_col].dt
+    day_of_week = dates.dayofweek
+    df = df.assign(
+        year=dates.year,
+        month=dates.month,
+        day_of_month=dates.day,
+        day_of_week=day_of_week,
+        day_of_year=dates.dayofyear,
+        week_of_year=dates.isocalendar().week,
+        quarter=dates.quarter,
+        is_weekend=(day_of_week >= 5).astype(np.int8),
+        is_month_start=dates.is_month_start.astype(np.int8),
+        is_month_end=dates.is_month_end.astype(np.int8),
+        is_quarter_start=dates.is_quarter_start.astype(np.int8),
+        is_quarter_end=dates.is_quarter_end.astype(np.int8),
+        is_year_start=dates.is_year_start.astype(np.int8),
+        is_year_end=dates.is_year_end.astype(np.int8),
+    )
     
     print("\nAdded time-based features to dataset.")
     return df
 
 
+# Natural seasonal period, in samples, for each single-step sampling offset
+SEASONAL_PERIODS = {
+    pd.offsets.Minute: 1440,
+    pd.offsets.Hour: 24,
+    pd.offsets.Day: 7,
+    pd.offsets.BusinessDay: 5,
+    pd.offsets.CustomBusinessDay: 5,
+    pd.offsets.Week: 52,
+    pd.offsets.MonthEnd: 12,
+    pd.offsets.MonthBegin: 12,
+    pd.offsets.BusinessMonthEnd: 12,
+    pd.offsets.BusinessMonthBegin: 12,
+    pd.offsets.QuarterEnd: 4,
+    pd.offsets.QuarterBegin: 4,
+    pd.offsets.BQuarterEnd: 4,
+    pd.offsets.BQuarterBegin: 4,
+}
+
+
+def _freq_seasonal_period(freq):
+    """
+    Seasonal period implied by a frequency alias such as 'D', '2h' or 'BME'.
+    
+    Multiples divide the base period (e.g. '15min' gives 96 samples per day).
+    Returns None for unrecognised aliases, or when the multiple does not divide
+    the base period into at least two samples.
+    """
+    try:
+        offset = pd.tseries.frequencies.to_offset(freq)
+    except (TypeError, ValueError):
+        return None
+    base = SEASONAL_PERIODS.get(type(offset))
+    if base is None or offset.n <= 0 or base % offset.n:
+        return None
+    period = base // offset.n
+    return period if period >= 2 else None
+
+
+def _seasonal_period(dates):
+    """Seasonal period implied by the sampling frequency of dates, or None if irregular."""
+    try:
+        freq = pd.infer_freq(pd.DatetimeIndex(dates).sort_values())
+    except (TypeError, ValueError):
+        return None
+    if not freq:
+        return None
+    return _freq_seasonal_period(freq)
+
+
+# Series shorter than this run full-resolution Pelt directly; the RBF cost keeps
+# an n x n Gram matrix, so only long series go through the coarse-to-fine path
+CP_TWO_STAGE_MIN_POINTS = 5000
+
+# Block size for the coarse change-point pass, and how many blocks either side
+# of a coarse change point are searched at full resolution
+CP_DECIMATION = 8
+CP_REFINE_BLOCKS = 16
+
+
+def _group_mean_bincount(key, y, k):
+    """Mean of y for each integer key in [0, k) in a single pass; empty groups are NaN."""
+    sums = np.bincount(key, weights=y, minlength=k)
+    counts = np.bincount(key, minlength=k)
+    means = sums / np.maximum(counts, 1)
+    means[counts == 0] = np.nan
+    return means
+
+
 def analyze_time_patterns(df, date_col, sales_col):
     """Analyzes sales patterns by different time periods."""
     print("\n===== Time-based Sales Patterns =====")
     
-    # Set date as index
-    df_time = df.copy()
-    df_time.set_index(date_col, inplace=True)
+    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+    
+    # Integer day-of-week / month / year keys, computed once and shared by all aggregations
+    dates = pd.DatetimeIndex(df[date_col])
+    y = df[sales_col].to_numpy(dtype=float)
+    # NaT dates make the calendar fields float NaN, which bincount rejects
+    valid = ~np.isnan(y) & ~dates.isna()
+    y = y[valid]
+    dow = dates.dayofweek.to_numpy()[valid].astype(int)
+    mon = dates.month.to_numpy()[valid].astype(int) - 1
+    year = dates.year.to_numpy()[valid].astype(int)
+    first_year = int(year.min()) if len(year) else 0
+    year_offset = year - first_year
+    n_years = int(year_offset.max()) + 1 if len(year) else 0
+    # Composite keys for the heatmap and monthly trend, built from the NaT-filtered int arrays
+    dow_month = dow * 12 + mon
+    year_month = year_offset * 12 + mon
     
     # Monthly pattern
-    monthly_avg = df_time.groupby(df_time.index.month)[sales_col].mean()
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    monthly_avg.index = [months[i-1] for i in monthly_avg.index]
+    monthly_avg = pd.Series(_group_mean_bincount(mon, y, 12), index=months).dropna()
     
     # Day of week pattern
-    dow_avg = df_time.groupby(df_time.index.dayofweek)[sales_col].mean()
-    days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    dow_avg.index = [days[i] for i in dow_avg.index]
+    dow_avg = pd.Series(_group_mean_bincount(dow, y, 7), index=days).dropna()
     
     # Plots
     plt.figure(figsize=(15, 10))
@@ -185,8 +331,11 @@ def analyze_time_patterns(df, date_col, sales_col):
     plt.title('Average Sales by Day of Week')
     
     # Yearly trend (if multiple years exist)
-    if df_time.index.year.nunique() > 1:
-        yearly_avg = df_time.groupby(df_time.index.year)[sales_col].mean()
+    if n_years > 1:
+        yearly_avg = pd.Series(
+            _group_mean_bincount(year_offset, y, n_years),
+            index=np.arange(first_year, first_year + n_years)
+        ).dropna()
         plt.subplot(2, 2, 3)
         sns.lineplot(x=yearly_avg.index, y=yearly_avg.values, marker='o')
         plt.title('Average Sales by Year')
@@ -195,14 +344,11 @@ def analyze_time_patterns(df, date_col, sales_col):
     # Time heatmap (month vs day of week)
     if len(df) >= 30:  # Ensure enough data
         plt.subplot(2, 2, 4)
-        heatmap_data = df.pivot_table(
-            index='day_of_week', 
-            columns='month', 
-            values=sales_col, 
-            aggfunc='mean'
-        )
-        heatmap_data.index = days
-        heatmap_data.columns = [months[i-1] for i in heatmap_data.columns]
+        heatmap_data = pd.DataFrame(
+            _group_mean_bincount(dow_month, y, 7 * 12).reshape(7, 12),
+            index=days,
+            columns=months
+        ).dropna(axis=1, how='all')
         sns.heatmap(heatmap_data, cmap="YlGnBu", annot=True, fmt=".0f", linewidths=.5)
         plt.title('Sales Heatmap: Day of Week vs Month')
     
@@ -212,8 +358,12 @@ def analyze_time_patterns(df, date_col, sales_col):
     # Interactive time analysis with Plotly
     try:
         # Monthly trend over years
-        monthly_data = df.groupby([df[date_col].dt.year, df[date_col].dt.month])[sales_col].mean().reset_index()
-        monthly_data['date'] = pd.to_datetime(monthly_data[date_col.name].astype(str) + '-' + monthly_data['month'].astype(str) + '-01')
+        month_means = _group_mean_bincount(year_month, y, n_years * 12)
+        month_keys = np.flatnonzero(~np.isnan(month_means))
+        monthly_data = pd.DataFrame({
+            'date': pd.to_datetime({'year': first_year + month_keys // 12, 'month': month_keys % 12 + 1, 'day': 1}),
+            sales_col: month_means[month_keys]
+        })
         
         fig = px.line(monthly_data, x='date', y=sales_col, title=f'Monthly {sales_col} Trend')
         fig.update_xaxes(title_text='Date')
@@ -225,19 +375,28 @@ def analyze_time_patterns(df, date_col, sales_col):
     return df
 
 
-def detect_anomalies(df, sales_col):
+def detect_anomalies(df, date_col, sales_col):
     """Performs anomaly detection using Isolation Forest and STL decomposition."""
     print("\n===== Anomaly Detection =====")
     
+    # STL needs at least two full cycles of the sampling frequency's natural period
+    period = _seasonal_period(df[date_col])
+    if period is None:
+        period = 12
+        print(f"Sampling frequency has no natural seasonal period; using default period {period}")
+    if len(df) < 2 * period:
+        print(f"Not enough data for STL anomaly detection (need at least {2 * period} data points)")
+        return df
+    
     try:    
         # Isolation Forest
-        iso_forest = IsolationForest(contamination=0.05, random_state=42)
-        df['anomaly_iso'] = iso_forest.fit_predict(df[[sales_col]])
-        df['anomaly_iso'] = df['anomaly_iso'].map({1: 0, -1: 1})  # Convert to 0/1
+        iso_forest = IsolationForest(contamination=0.05, random_state=42, n_jobs=-1)
+        iso_outlier = iso_forest.fit_predict(df[[sales_col]]) == -1
+        df['anomaly_iso'] = iso_outlier.astype(int)
         
         # STL Decomposition
         df_sorted = df.sort_index()
-        stl = STL(df_sorted[sales_col], period=12, seasonal=13)
+        stl = STL(df_sorted[sales_col], period=period, seasonal=period + 1 if period % 2 == 0 else period)
         res = stl.fit()
         df_sorted['trend'] = res.trend
         df_sorted['seasonal'] = res.seasonal
@@ -251,7 +410,8 @@ def detect_anomalies(df, sales_col):
                         left_index=True, right_index=True, how='left')
         
         # Combined anomaly flag
-        df['is_anomaly'] = ((df['anomaly_iso'] == 1) | (df['anomaly_stl'] == 1)).astype(int)
+        is_anomaly = iso_outlier | (df['anomaly_stl'].to_numpy() == 1)
+        df['is_anomaly'] = is_anomaly.astype(int)
         
         # Plot results
         fig = make_subplots(rows=3, cols=1,
@@ -261,11 +421,11 @@ def detect_anomalies(df, sales_col):
         
         # Original series with anomalies
         fig.add_trace(
-            go.Scatter(x=df.index, y=df[sales_col], mode='lines', name='Sales'),
+            go.Scatter(**_decimated_xy(df.index, df[sales_col]), mode='lines', name='Sales'),
             row=1, col=1
         )
         
-        anomalies = df[df['is_anomaly'] == 1]
+        anomalies = df[is_anomaly]
         fig.add_trace(
             go.Scatter(x=anomalies.index, y=anomalies[sales_col], 
                         mode='markers', name='Anomalies', marker=dict(color='red', size=10)),
@@ -274,18 +434,18 @@ def detect_anomalies(df, sales_col):
         
         # Trend and seasonal
         fig.add_trace(
-            go.Scatter(x=df.index, y=df['trend'], mode='lines', name='Trend'),
+            go.Scatter(**_decimated_xy(df.index, df['trend']), mode='lines', name='Trend'),
             row=2, col=1
         )
         
         fig.add_trace(
-            go.Scatter(x=df.index, y=df['seasonal'], mode='lines', name='Seasonal'),
+            go.Scatter(**_decimated_xy(df.index, df['seasonal']), mode='lines', name='Seasonal'),
             row=2, col=1
         )
         
         # Residuals
         fig.add_trace(
-            go.Scatter(x=df.index, y=df['residual'], mode='lines', name='Residual'),
+            go.Scatter(**_decimated_xy(df.index, df['residual']), mode='lines', name='Residual'),
             row=3, col=1
         )
         
@@ -306,13 +466,13 @@ def detect_anomalies(df, sales_col):
         fig.update_layout(height=800, title_text=f"Anomaly Detection for {sales_col}")
         fig.show()
         
-        print(f"\nDetected {df['is_anomaly'].sum()} anomalies in the data")
+        print(f"\nDetected {len(anomalies)} anomalies in the data")
         
         # Summary of anomalies
-        if df['is_anomaly'].sum() > 0:
+        if len(anomalies) > 0:
             print("\nTop 10 Anomalies:")
-            top_anomalies = df[df['is_anomaly'] == 1].sort_values(by='residual', key=abs, ascending=False)
-            print(top_anomalies[[df.index, sales_col, 'residual']].head(10))
+            top_anomalies = anomalies.sort_values(by='residual', key=abs, ascending=False)
+            print(top_anomalies[[date_col, sales_col, 'residual']].head(10))
 
     except Exception as e:
         print(f"Error in anomaly detection: {e}")
@@ -324,8 +484,11 @@ def test_stationarity(df, sales_col):
     """Tests time series stationarity using ADF test and plots."""
     print("\n===== Stationarity Tests =====")
     
-    # ADF Test
-    result = adfuller(df[sales_col].dropna())
+    # Non-null series shared by the ADF test and ACF/PACF plots
+    y = df[sales_col].dropna()
+    
+    # ADF Test with a fixed lag truncation instead of an AIC search over every lag
+    result = adfuller(y, autolag=None, maxlag=min(12, int(len(y) ** 0.25 * 4)))
     print('Augmented Dickey-Fuller Test:')
     print(f'ADF Statistic: {result[0]}')
     print(f'p-value: {result[1]}')
@@ -346,21 +509,21 @@ def test_stationarity(df, sales_col):
     
     # Plot ACF and PACF
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
-    plot_acf(df[sales_col].dropna(), ax=ax1, lags=30)
-    plot_pacf(df[sales_col].dropna(), ax=ax2, lags=30)
+    # FFT-based autocovariance keeps ACF at O(n log n) on long series
+    plot_acf(y, ax=ax1, lags=30, fft=True)
+    plot_pacf(y, ax=ax2, lags=30, method='ywm')
     plt.tight_layout()
     plt.show()
     
     return is_stationary
 
 
-def analyze_seasonality(df, sales_col):
+def analyze_seasonality(df, date_col, sales_col):
     """Analyzes seasonality pattern in the time series."""
     print("\n===== Seasonality Analysis =====")
     
     # Make sure data is sorted by date
-    df_ts = df.copy(deep=True)
-    df_ts.sort_index(inplace=True)
+    df_ts = df.sort_index()
     
     # Decompose time series
     try:
@@ -372,18 +535,26 @@ def analyze_seasonality(df, sales_col):
             return df
         
         # Try to determine seasonality automatically
-        acf_values = acf(df_ts[sales_col].dropna(), nlags=len(df_ts) // 2)
+        acf_values = acf(df_ts[sales_col].dropna(), nlags=len(df_ts) // 2, fft=True)
         candidate_periods = []
         for i in range(2, len(acf_values) // 3):
             if acf_values[i] > 0.5 and acf_values[i] > acf_values[i-1] and acf_values[i] > acf_values[i+1]:
                 candidate_periods.append(i)
         
-        seasonal_period = 12  # Default to 12 (monthly)
+        # Default to the natural period of the sampling frequency (e.g. 7 for daily data)
+        seasonal_period = _seasonal_period(df_ts[date_col])
         if candidate_periods:
             seasonal_period = candidate_periods[0]
             print(f"Automatically detected seasonal period: {seasonal_period}")
+        elif seasonal_period:
+            print(f"No strong seasonality detected. Using frequency-based period: {seasonal_period}")
         else:
-            print(f"No strong seasonality detected. Using default period: {seasonal_period}")
+            print("No strong seasonality detected and the sampling frequency is irregular; skipping decomposition")
+            return df
+        
+        if len(df_ts) < 2 * seasonal_period:
+            print(f"Not enough data for a period-{seasonal_period} decomposition (need at least {2 * seasonal_period} data points)")
+            return df
         
         # STL Decomposition
         stl = STL(df_ts[sales_col], period=seasonal_period)
@@ -450,7 +621,7 @@ def create_lag_features(df, sales_col, date_col, lags=[1, 7, 30]):
     """Creates lag features for time series data."""
     print("\n===== Creating Lag Features =====")
     
-    df_sorted = df.sort_values(by=date_col).copy()
+    df_sorted = df.sort_values(by=date_col)
     
     for lag in lags:
         df_sorted[f'lag_{lag}'] = df_sorted[sales_col].shift(lag)
@@ -459,20 +630,21 @@ def create_lag_features(df, sales_col, date_col, lags=[1, 7, 30]):
         df_sorted[f'pct_change_{lag}'] = df_sorted[sales_col].pct_change(periods=lag)
     
     # Create rolling window features
-    windows = [7, 14, 30]
+    windows = [w for w in [7, 14, 30] if len(df) > w]
     for window in windows:
-        if len(df) > window:
-            df_sorted[f'rolling_mean_{window}'] = df_sorted[sales_col].rolling(window=window).mean()
-            df_sorted[f'rolling_std_{window}'] = df_sorted[sales_col].rolling(window=window).std()
-            
-            # Expanding mean - cumulative average up to current point
-            df_sorted[f'expanding_mean'] = df_sorted[sales_col].expanding().mean()
+        df_sorted[f'rolling_mean_{window}'] = df_sorted[sales_col].rolling(window=window).mean()
+        df_sorted[f'rolling_std_{window}'] = df_sorted[sales_col].rolling(window=window).std()
+    
+    if windows:
+        # Expanding mean - cumulative average up to current point
+        df_sorted[f'expanding_mean'] = df_sorted[sales_col].expanding().mean()
     
-    # Create trend indicator
+    # Create trend indicator: sign of the change across each 3-point window
     if len(df) >= 3:
-        df_sorted['short_trend'] = df_sorted[sales_col].rolling(window=3).apply(
-            lambda x: 1 if (x.iloc[2] > x.iloc[0]) else (-1 if (x.iloc[2] < x.iloc[0]) else 0)
-        )
+        sales = df_sorted[sales_col]
+        short_trend = np.sign(sales.diff(2))
+        short_trend[sales.shift(1).isna()] = np.nan  # window with a missing middle point
+        df_sorted['short_trend'] = short_trend
     
     # Create seasonality features if enough data (simple fourier terms)
     if len(df) >= 30:
@@ -506,7 +678,7 @@ def feature_importance_analysis(df, sales_col, date_col):
             return df
         
         # Remove rows with NaN (from lag features)
-        df_clean = df.dropna().copy()
+        df_clean = df.dropna()
         if len(df_clean) < len(df) * 0.5:  # If too many rows lost
             print(f"Warning: {len(df) - len(df_clean)} rows dropped due to missing values")
         
@@ -579,8 +751,7 @@ def forecast_models(df, date_col, sales_col):
     
     try:
         # Create time series dataframe
-        df_ts = df[[date_col, sales_col]].sort_values(by=date_col).copy()
-        df_ts = df_ts.set_index(date_col)
+        df_ts = df[[date_col, sales_col]].sort_values(by=date_col).set_index(date_col)
         
         # Determine forecast horizon
         forecast_periods = min(int(len(df_ts) * 0.2), 30)  # 20% of data or 30 periods max
@@ -622,6 +793,8 @@ def forecast_models(df, date_col, sales_col):
         
         # 3. Prophet
         try:
+            from prophet import Prophet
+            
             # Prepare data for Prophet
             prophet_train = pd.DataFrame({
                 'ds': train.index,
@@ -700,6 +873,8 @@ def forecast_models(df, date_col, sales_col):
                 future_forecast = pd.Series(future_forecast, index=future_dates)
                 
             elif best_model == 'Prophet':
+                from prophet import Prophet
+                
                 prophet_data = pd.DataFrame({
                     'ds': df_ts.index,
                     'y': df_ts.values.ravel()
@@ -735,14 +910,18 @@ def forecast_models(df, date_col, sales_col):
     return df
 
 
-def run_causal_impact(df, sales_col, date_col):
-    """Applies CausalImpact to assess how an event affected sales."""
+def run_causal_impact(df, sales_col, date_col, event_date=None):
+    """Applies CausalImpact to assess how an event affected sales, prompting for the event date unless one is given."""
     print("\n===== Causal Impact Analysis =====")
     
     try:
+        # Imported here: causalimpact is slow to import and only needed by this step
+        from causalimpact import CausalImpact
+        
         # Ask user for event date
-        print("\nEnter the date when an event occurred (format: YYYY-MM-DD)")
-        event_date = input().strip()
+        if event_date is None:
+            print("\nEnter the date when an event occurred (format: YYYY-MM-DD)")
+            event_date = input().strip()
         
         # Ensure date format is correct
         try:
@@ -769,8 +948,7 @@ def run_causal_impact(df, sales_col, date_col):
             print("Analysis might not be reliable. Continuing anyway...")
         
         # Prepare data for CausalImpact (time series format)
-        df_ci = df.sort_values(by=date_col).copy()
-        df_ci.set_index(date_col, inplace=True)
+        df_ci = df.sort_values(by=date_col).set_index(date_col)
         data = df_ci[[sales_col]]
         
         # Define time periods
@@ -821,44 +999,104 @@ def run_causal_impact(df, sales_col, date_col):
     return df
 
 
+def _rbf_gamma(signal, max_points=2000):
+    """ruptures' median-heuristic RBF bandwidth, estimated on an evenly spaced subsample."""
+    from scipy.spatial.distance import pdist
+    
+    sample = signal[::max(1, len(signal) // max_points)].reshape(-1, 1)
+    median = np.median(pdist(sample, metric="sqeuclidean"))
+    return 1.0 / median if median else 1.0
+
+
+def _two_stage_pelt(signal, pen, factor=CP_DECIMATION, min_points=CP_TWO_STAGE_MIN_POINTS):
+    """
+    RBF-cost PELT that, for long signals, runs on a block-averaged signal first
+    and then re-runs full-resolution PELT only in windows around the coarse
+    change points.
+    
+    Block means shrink segment costs by about the block size, so the coarse pass
+    uses a scaled-down penalty; it is set low enough to over-detect, and the
+    full-resolution pass with the original penalty and the whole signal's RBF
+    bandwidth decides which change points are kept. Overlapping windows are
+    merged, so several close change points are refined together.
+    
+    Returns breakpoints in ruptures' convention (sorted, ending with len(signal)).
+    """
+    from ruptures import Pelt
+    
+    n = len(signal)
+    if n < max(min_points, 4 * factor):
+        return Pelt(model="rbf").fit(signal).predict(pen=pen)
+    
+    # Coarse pass: block means shrink the O(n^2) kernel work by factor^2
+    m = n // factor
+    coarse = signal[:m * factor].reshape(m, factor).mean(axis=1)
+    coarse_cps = Pelt(model="rbf", min_size=1, jump=1).fit(coarse).predict(pen=pen / (2 * factor))[:-1]
+    
+    # Merge the full-resolution windows around the coarse change points. Window
+    # starts are aligned to Pelt's default jump so candidates match a full run.
+    jump = 5
+    windows = []
+    for c in coarse_cps:
+        lo = max(0, (c - CP_REFINE_BLOCKS) * factor)
+        lo -= lo % jump
+        hi = min(n, (c + CP_REFINE_BLOCKS) * factor)
+        if windows and lo <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], hi)
+        else:
+            windows.append([lo, hi])
+    
+    # Refine: full-resolution Pelt inside each window, with a shared bandwidth
+    gamma = _rbf_gamma(signal)
+    refined = []
+    for lo, hi in windows:
+        local = Pelt(model="rbf", params={"gamma": gamma}, jump=jump).fit(signal[lo:hi]).predict(pen=pen)
+        refined.extend(lo + b for b in local[:-1])
+    
+    return refined + [n]
+
+
 def analyze_change_points(df, date_col, sales_col):
     """Detects structural changes in the time series data."""
     print("\n===== Change Point Detection =====")
     
     try:
-        from ruptures import Pelt, KernelCPD
-        from sklearn.preprocessing import StandardScaler
+        from ruptures import KernelCPD
         
         # Prepare data
-        df_cp = df.sort_values(by=date_col).copy()
-        series = df_cp[sales_col].values
+        df_cp = df.sort_values(by=date_col)
+        series = df_cp[sales_col].to_numpy(dtype=float)
         
-        # Standardize for better detection
-        series_std = StandardScaler().fit_transform(series.reshape(-1, 1)).flatten()
+        # Standardize for better detection (same zero-variance handling as StandardScaler)
+        scale = np.nanstd(series) or 1.0
+        series_std = (series - np.nanmean(series)) / scale
         
         # Pelt change point detection
-        model = Pelt(model="rbf").fit(series_std)
-        change_points = model.predict(pen=10)
+        change_points = _two_stage_pelt(series_std, pen=10)
         
         # Alternative: Kernel change point detection
         kernel_model = KernelCPD(kernel="rbf", jump=5).fit(series_std)
         kernel_change_points = kernel_model.predict(pen=3)
         
+        # Change point dates (the last breakpoint is the series end)
+        dates = df_cp[date_col].to_numpy()
+        pelt_dates = dates[change_points[:-1]]
+        kernel_dates = dates[kernel_change_points[:-1]]
+        
         # Plot results
         plt.figure(figsize=(12, 8))
         
-        plt.subplot(2, 1, 1)
+        # All change points drawn as one full-height line collection per subplot
+        ax = plt.subplot(2, 1, 1)
         plt.plot(df_cp[date_col], series)
-        for cp in change_points[:-1]:  # Exclude the last one which is the series end
-            plt.axvline(x=df_cp[date_col].iloc[cp], color='r', linestyle='--')
+        ax.vlines(pelt_dates, 0, 1, transform=ax.get_xaxis_transform(), colors='r', linestyles='--')
         plt.title(f'Change Points in {sales_col} (Pelt Method)')
         plt.xlabel('Date')
         plt.ylabel(sales_col)
         
-        plt.subplot(2, 1, 2)
+        ax = plt.subplot(2, 1, 2)
         plt.plot(df_cp[date_col], series)
-        for cp in kernel_change_points[:-1]:  # Exclude the last one which is the series end
-            plt.axvline(x=df_cp[date_col].iloc[cp], color='g', linestyle='--')
+        ax.vlines(kernel_dates, 0, 1, transform=ax.get_xaxis_transform(), colors='g', linestyles='--')
         plt.title(f'Change Points in {sales_col} (Kernel Method)')
         plt.xlabel('Date')
         plt.ylabel(sales_col)
@@ -878,9 +1116,7 @@ def analyze_change_points(df, date_col, sales_col):
                 print(f"- {df_cp[date_col].iloc[cp]}")
                 
         # Add change points to dataframe
-        df['is_change_point'] = 0
-        for cp in change_points[:-1]:
-            df.loc[df[date_col] == df_cp[date_col].iloc[cp], 'is_change_point'] = 1
+        df['is_change_point'] = df[date_col].isin(pelt_dates).astype(int)
             
         return df
         
@@ -916,21 +1152,18 @@ def identify_outlier_periods(df, date_col, sales_col):
         # Flag outlier periods (absolute z-score > 2)
         df['is_outlier_period'] = (abs(df['deviation_zscore']) > 2).astype(int)
         
-        # Identify clusters of outliers (outlier periods)
-        outlier_periods = []
-        current_period = []
+        # Identify clusters of outliers (outlier periods): runs of consecutive
+        # flagged dates, found from the edges of the padded flag sequence
+        ordered = df.sort_values(by=date_col)[[date_col, 'is_outlier_period']]
+        flags = (ordered['is_outlier_period'].to_numpy() == 1).astype(np.int8)
+        edges = np.diff(np.concatenate(([0], flags, [0])))
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1) - 1
         
-        for i, row in df.sort_values(by=date_col).iterrows():
-            if row['is_outlier_period'] == 1:
-                current_period.append(row[date_col])
-            elif current_period:
-                if len(current_period) >= 2:  # Only consider periods with at least 2 consecutive outliers
-                    outlier_periods.append((min(current_period), max(current_period)))
-                current_period = []
-        
-        # Add the last period if it exists
-        if current_period and len(current_period) >= 2:
-            outlier_periods.append((min(current_period), max(current_period)))
+        # Only consider periods with at least 2 consecutive outliers
+        long_runs = run_ends > run_starts
+        dates = ordered[date_col]
+        outlier_periods = list(zip(dates.iloc[run_starts[long_runs]], dates.iloc[run_ends[long_runs]]))
         
         # Plot results
         plt.figure(figsize=(12, 6))
@@ -982,8 +1215,9 @@ def correlation_analysis(df, sales_col):
         # Select numeric columns only
         num_df = df.select_dtypes(include=[np.number])
         
-        # Calculate correlation with sales
-        correlations = num_df.corr()[sales_col].sort_values(ascending=False)
+        # Calculate correlation with sales (the heatmap reuses this matrix)
+        corr_all = num_df.corr()
+        correlations = corr_all[sales_col].sort_values(ascending=False)
         
         # Print top positive and negative correlations
         print("\nTop Positive Correlations with Sales:")
@@ -996,7 +1230,7 @@ def correlation_analysis(df, sales_col):
         top_corr_features = correlations.abs().sort_values(ascending=False).head(15).index
         
         plt.figure(figsize=(12, 10))
-        corr_matrix = num_df[top_corr_features].corr()
+        corr_matrix = corr_all.loc[top_corr_features, top_corr_features]
         mask = np.triu(np.ones_like(corr_matrix, dtype=bool))
         sns.heatmap(corr_matrix, mask=mask, annot=True, cmap='coolwarm', fmt=".2f", linewidths=0.5)
         plt.title('Correlation Heatmap')
@@ -1006,11 +1240,14 @@ def correlation_analysis(df, sales_col):
         # Scatter plots for top correlated features
         top_features = correlations.abs().sort_values(ascending=False).index[1:6]  # Exclude sales itself
         
+        # One shared sample keeps the scatter and regplot's bootstrap bounded on large frames
+        plot_df = df.sample(n=MAX_PLOT_POINTS, random_state=0) if len(df) > MAX_PLOT_POINTS else df
+        
         fig, axes = plt.subplots(2, 2, figsize=(15, 10))
         axes = axes.flatten()
         
         for i, feature in enumerate(top_features[:4]):
-            sns.regplot(x=feature, y=sales_col, data=df, ax=axes[i])
+            sns.regplot(x=feature, y=sales_col, data=plot_df, ax=axes[i])
             axes[i].set_title(f'{feature} vs {sales_col}')
             
         plt.tight_layout()
@@ -1022,8 +1259,14 @@ def correlation_analysis(df, sales_col):
     return df
 
 
-def comprehensive_sales_analysis(df, date_col, sales_col):
-    """Comprehensive analysis pipeline for sales data."""
+def comprehensive_sales_analysis(df, date_col, sales_col, causal_impact=None, save=None, event_date=None):
+    """
+    Comprehensive analysis pipeline for sales data.
+    
+    causal_impact and save answer the optional-step prompts; when None the user
+    is asked if stdin is interactive, and the step is skipped otherwise.
+    event_date is passed to the Causal Impact step instead of prompting for it.
+    """
     print("\n" + "="*50)
     print("COMPREHENSIVE SALES ANALYSIS")
     print("="*50)
@@ -1065,17 +1308,15 @@ def comprehensive_sales_analysis(df, date_col, sales_col):
     df = identify_outlier_periods(df, date_col, sales_col)
     
     # Optional: Causal Impact (only if user has a specific event date)
-    run_causal_impact_option = input("\nDo you want to run Causal Impact Analysis? (y/n): ").strip().lower()
-    if run_causal_impact_option == 'y':
-        df = run_causal_impact(df, sales_col, date_col)
+    if _confirm("\nDo you want to run Causal Impact Analysis? (y/n): ", causal_impact):
+        df = run_causal_impact(df, sales_col, date_col, event_date)
     
     print("\n" + "="*50)
     print("ANALYSIS COMPLETED")
     print("="*50)
     
     # Save the enhanced dataframe with all features
-    save_option = input("\nDo you want to save the enhanced dataset with all generated features? (y/n): ").strip().lower()
-    if save_option == 'y':
+    if _confirm("\nDo you want to save the enhanced dataset with all generated features? (y/n): ", save):
         filename = f"enhanced_sales_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M')}.csv"
         df.to_csv(filename, index=False)
         print(f"Enhanced dataset saved to {filename}")
@@ -1083,21 +1324,40 @@ def comprehensive_sales_analysis(df, date_col, sales_col):
     return df
 
 
-def main():
+def main(argv=None):
     """Main function to run the analysis."""
+    parser = argparse.ArgumentParser(description="Advanced sales time series analysis")
+    parser.add_argument("csv_path", nargs="?", help="sales CSV file (prompted for if omitted)")
+    parser.add_argument("--date-col", help="date column name (prompted for if omitted)")
+    parser.add_argument("--sales-col", help="sales/target column name (auto-detected if omitted)")
+    parser.add_argument("--causal-impact", action=argparse.BooleanOptionalAction, default=None,
+                        help="run the Causal Impact step (asked interactively if omitted, skipped without a terminal)")
+    parser.add_argument("--event-date", help="event date for the Causal Impact step, YYYY-MM-DD (prompted for if omitted)")
+    parser.add_argument("--save", action=argparse.BooleanOptionalAction, default=None,
+                        help="save the enhanced dataset (asked interactively if omitted, skipped without a terminal)")
+    args = parser.parse_args(argv)
+    
+    # Without a terminal nothing is read from stdin, so inputs that would be prompted for must be flags
+    if not sys.stdin.isatty():
+        missing = [name for name, value in [("csv_path", args.csv_path), ("--date-col", args.date_col)] if value is None]
+        if args.causal_impact and args.event_date is None:
+            missing.append("--event-date")
+        if missing:
+            parser.error(f"stdin is not a terminal; pass {', '.join(missing)}")
+    
     print("="*50)
     print("ADVANCED SALES TIME SERIES ANALYSIS")
     print("="*50)
     print("\nThis tool will help you analyze your sales data and identify key patterns, anomalies, and predictors.")
     
     # Load data
-    df = load_csv()
+    df = load_csv(args.csv_path)
     
     # Select columns
-    df, date_col, sales_col = select_columns(df)
+    df, date_col, sales_col = select_columns(df, args.date_col, args.sales_col)
     
     # Run comprehensive analysis
-    df = comprehensive_sales_analysis(df, date_col, sales_col)
+    df = comprehensive_sales_analysis(df, date_col, sales_col, args.causal_impact, args.save, args.event_date)
     
     print("\nThank you for using the Advanced Sales Analysis Tool!")
 